@@ -0,0 +1,305 @@
+import glob
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Cura でスライスした G-code を解析する
+# ファイルは mmap で開き、全体を読み込まずにレイヤー（;LAYER:n）ごとに処理する。
+# レイヤーの位置（バイトオフセット）と統計は索引としてキャッシュのディレクトリ（~/.cache/gcode-index）に保存し、
+# 次回からはファイルの大きさと更新時刻が同じなら読み直さない（任意のレイヤーをすぐに開ける）
+# ラフトのレイヤーは負の番号で、同じ番号が続くこともあるので、レイヤーはファイル中の順番で数える
+#
+#   python gcode.py 全部品 歯車
+
+INDEX_VERSION = 3
+HEADER_SIZE = 4096  # ヘッダのコメントを探す先頭のバイト数
+
+LAYER_PATTERN = re.compile(rb'^;LAYER:(-?\d+)', re.M)
+HEADER_PATTERN = re.compile(rb'^;([A-Za-z ]+):[ \t]*([^\r\n]*)', re.M)
+# 移動と座標系の設定の行（Cura の語順 F X Y Z E、終了 G-code の E F / Z E F にも対応）
+# 値は数値の部分だけを取り出す（「E1;comment」のように空白なしで続くコメントは含めない）
+# 軸でない語（行末の $49 など）は読み飛ばし、この語順で読み切れなかった残り（コメントの前まで）があれば
+# その行だけ WORD_PATTERN で読み直す
+NUMBER = rb'([-+]?(?:\d+\.?\d*|\.\d+))'
+AXES = [b'F', b'X', b'Y', b'Z', b'E', b'F']
+MOVE_PATTERN = re.compile(
+    rb'^(G0|G1|G92|G90|G91|M82|M83)(?![0-9])'
+    + b''.join(rb'(?:[ \t]+' + axis + NUMBER + rb')?' for axis in AXES)
+    + rb'(?:[ \t]+[^FXYZE;\s][^ \t;\r\n]*)*[ \t]*([^;\r\n]*)',
+    re.M)
+WORD_PATTERN = re.compile(rb'(?:^|[ \t])([FXYZE])' + NUMBER)
+COMMANDS = {b'G0': 0, b'G1': 1, b'G92': 2, b'G90': 3, b'G91': 4, b'M82': 5, b'M83': 6}
+G0, G1, G92, G90, G91, M82, M83 = range(7)
+
+# buffer の [start, end) を1行ずつ返す（改行は除く）
+def iter_lines(buffer, start=0, end=None):
+    end = len(buffer) if end is None else end
+    position = start
+    while position < end:
+        newline = buffer.find(b'\n', position, end)
+        if newline < 0:
+            newline = end
+        yield buffer[position:newline].rstrip(b'\r').decode('utf-8', errors='replace')
+        position = newline + 1
+
+# ;Print time: 18 minutes などのヘッダのコメント
+def parse_header(buffer):
+    return {key.decode(): value.decode('utf-8', errors='replace').strip()
+            for key, value in HEADER_PATTERN.findall(buffer[:HEADER_SIZE])}
+
+# ファイル中の順番に (レイヤー番号, 開始, 終了) のバイトオフセットの並び（最初の ;LAYER: より前の開始 G-code は番号 None）
+def scan_layers(buffer):
+    starts = [(int(match.group(1)), match.start()) for match in LAYER_PATTERN.finditer(buffer)]
+    layers = [(None, 0)] + starts
+    ends = [start for _, start in starts] + [len(buffer)]
+    return [(layer, start, end) for (layer, start), end in zip(layers, ends) if end > start]
+
+# 語順どおりでない行（G1 X0.1 Y20 Z0.3 F5000.0 E15 など）の値を F X Y Z E F の順に並べ直す
+# 同じ軸が2回あれば先に書かれた値を使う（送り速度は最初の列に入れる）
+def _reorder(row):
+    command, *values, rest = row
+    words = {}
+    for axis, value in list(zip(AXES, values)) + WORD_PATTERN.findall(rest):
+        if value:
+            words.setdefault(axis, value)
+    return [command] + [words.get(axis, b'') for axis in AXES[:5]] + [b'']
+
+# [start, end) の移動の行を (コマンド番号, (行数, 6) の値 F X Y Z E F) にする（ない値は nan）
+def parse_moves(buffer, start, end):
+    rows = MOVE_PATTERN.findall(buffer[start:end])
+    if not rows:
+        return np.zeros(0, dtype=np.int8), np.zeros((0, 6))
+    table = np.array(rows, dtype='S24')
+    for i in np.flatnonzero(table[:, -1] != b''):
+        table[i, :-1] = _reorder(rows[i])
+    table = table[:, :-1]
+    names, inverse = np.unique(table[:, 0], return_inverse=True)
+    codes = np.array([COMMANDS[name] for name in names], dtype=np.int8)[inverse]
+    values = table[:, 1:]
+    values[values == b''] = b'nan'
+    return codes, values.astype(np.float64)
+
+# mask が True だった直前（自分を含む）の行番号（なければ -1）
+def _last(mask):
+    return np.maximum.accumulate(np.where(mask, np.arange(mask.size), -1)) if mask.size else mask.astype(int)
+
+# 各行の後の座標。absolute の行は値をそのまま、相対の行は足し込み、G92 は値に設定する
+def _positions(values, codes, absolute):
+    given = ~np.isnan(values)
+    move = (codes == G0) | (codes == G1)
+    assign = given & ((move & absolute) | (codes == G92))
+    delta = np.where(given & move & ~absolute, values, 0.0)
+    total = np.cumsum(delta)
+    last = _last(assign)
+    base = np.where(last >= 0, values[last] - total[np.maximum(last, 0)], 0.0)
+    return base + total
+
+# 全行のコマンドと値から、移動ごとの距離・押し出し量・送り速度・時間を配列でまとめて求める
+def motion_table(codes, values):
+    feed = np.where(np.isnan(values[:, 0]), values[:, 5], values[:, 0])
+    mode = codes[:, None] == np.array([G90, G91, M82, M83])
+    # 座標は G90 / G91、押し出しは G90 / M82 で絶対、G91 / M83 で相対（最初は絶対）
+    xyz_last = _last(mode[:, 0] | mode[:, 1])
+    xyz_absolute = (xyz_last < 0) | (codes[np.maximum(xyz_last, 0)] == G90)
+    e_last = _last(mode.any(axis=1))
+    e_absolute = (e_last < 0) | np.isin(codes[np.maximum(e_last, 0)], [G90, M82])
+
+    position = np.stack([_positions(values[:, axis], codes, xyz_absolute) for axis in (1, 2, 3)], axis=1)
+    extruder = _positions(values[:, 4], codes, e_absolute)
+    step = np.diff(position, axis=0, prepend=np.zeros((1, 3)))
+    extruded = np.diff(extruder, prepend=0.0)
+
+    # 送り速度 [mm/min] は指定されるまで前の値が続く
+    given = _last(~np.isnan(feed))
+    feed = np.where(given >= 0, feed[np.maximum(given, 0)], np.nan)
+
+    move = (codes == G0) | (codes == G1)
+    distance = np.linalg.norm(step, axis=1)
+    length = np.where(distance > 0, distance, np.abs(extruded))  # 押し出しだけの移動はフィラメントの長さ
+    with np.errstate(invalid='ignore', divide='ignore'):
+        seconds = np.where(move & (feed > 0), length / (feed / 60), 0.0)
+    return {
+        "move": move,
+        "z": position[:, 2],
+        "distance": np.where(move, distance, 0.0),
+        "extruded": np.where(move, extruded, 0.0),
+        "seconds": seconds,
+    }
+
+# レイヤーごとの統計（押し出し量 [mm]、印刷・移動の距離 [mm]、推定時間 [s]、高さ [mm]）
+# extrusion は引き戻し（retraction）と戻し分を差し引いた正味の量で、ヘッダの ;Filament used と同じ値になる
+# （引き戻しのあとに押し戻す分まで足すと、同じフィラメントを何度も数えてしまう）
+def layer_statistics(table, layer_index, layer_count):
+    extruded = table["extruded"]
+    printing = (extruded > 0) & (table["distance"] > 0)
+    travel = (extruded <= 0) & (table["distance"] > 0)
+
+    def total(weights):
+        return np.bincount(layer_index, weights, minlength=layer_count)
+
+    height = np.full(layer_count, np.nan)
+    np.fmax.at(height, layer_index[printing], table["z"][printing])
+    return {
+        "extrusion": total(extruded),
+        "retraction": total(np.clip(-extruded, 0, None)),
+        "print_distance": total(np.where(printing, table["distance"], 0.0)),
+        "travel_distance": total(np.where(travel, table["distance"], 0.0)),
+        "seconds": total(table["seconds"]),
+        "moves": total(table["move"].astype(float)).astype(int),
+        "z": height,
+    }
+
+# 索引を置くディレクトリ（環境変数 GCODE_INDEX_CACHE、なければ ~/.cache/gcode-index）
+def cache_directory():
+    default = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'gcode-index')
+    return os.environ.get('GCODE_INDEX_CACHE', default)
+
+# G-code ファイルの索引のパス（別の場所にある同じ名前のファイルとぶつからないよう、絶対パスのハッシュを付ける）
+def index_path(path, cache_dir=None):
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir or cache_directory(), f'{os.path.basename(path)}-{digest}.json')
+
+# 1つの G-code ファイル
+class GcodeFile:
+    def __init__(self, path, use_index=True, cache_dir=None):
+        self.path = path
+        self.use_index = use_index
+        self.index_path = index_path(path, cache_dir)
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._index = self._load_index() if use_index else None
+        if self._index is None:
+            self._index = {
+                "layers": scan_layers(self.buffer),
+                "header": parse_header(self.buffer),
+            }
+            self._save_index()
+        self.header = self._index["header"]
+        self.layers = [tuple(layer) for layer in self._index["layers"]]
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _index_key(self):
+        stat = os.stat(self.path)
+        return {"version": INDEX_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    # 保存した索引（ファイルが変わっていれば None）
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return index if index.get("key") == self._index_key() else None
+
+    # 書き込めない場所ならそのまま（毎回作り直す）
+    def _save_index(self):
+        if not self.use_index:
+            return
+        self._index["key"] = self._index_key()
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            with open(self.index_path, 'w', encoding='utf-8') as file:
+                json.dump(self._index, file)
+        except OSError:
+            pass
+
+    # ファイル中で position 番目のレイヤーの行（索引からその位置だけを読む）
+    def layer_lines(self, position):
+        _, start, end = self.layers[position]
+        return iter_lines(self.buffer, start, end)
+
+    # レイヤー番号 number のレイヤーの位置（ラフトの番号は複数あることがある）
+    def find_layer(self, number):
+        return [position for position, (layer, _, _) in enumerate(self.layers) if layer == number]
+
+    def lines(self):
+        return iter_lines(self.buffer)
+
+    # レイヤーごとの統計と合計（索引に保存してあればそれを返す）
+    def statistics(self):
+        if "statistics" in self._index:
+            return self._index["statistics"]
+        codes, values, layer_index = [], [], []
+        for i, (_, start, end) in enumerate(self.layers):
+            layer_codes, layer_values = parse_moves(self.buffer, start, end)
+            codes.append(layer_codes)
+            values.append(layer_values)
+            layer_index.append(np.full(layer_codes.size, i))
+        table = motion_table(np.concatenate(codes), np.concatenate(values))
+        layers = layer_statistics(table, np.concatenate(layer_index), len(self.layers))
+        numbers = [layer for layer, _, _ in self.layers]
+
+        statistics = {
+            "layers": {"layer": numbers, **{key: value.tolist() for key, value in layers.items()}},
+            "layer_count": sum(layer is not None and layer >= 0 for layer in numbers),
+            "raft_layer_count": sum(layer is not None and layer < 0 for layer in numbers),
+            "extrusion": float(layers["extrusion"].sum()),
+            "print_distance": float(layers["print_distance"].sum()),
+            "travel_distance": float(layers["travel_distance"].sum()),
+            "seconds": float(layers["seconds"].sum()),
+        }
+        self._index["statistics"] = statistics
+        self._save_index()
+        return statistics
+
+# ファイル1つの集計（プロセスプールから呼ぶ）
+def analyze_file(path, use_index=True):
+    with GcodeFile(path, use_index) as gcode:
+        statistics = gcode.statistics()
+        return {
+            "path": path,
+            "header": gcode.header,
+            "layer_count": statistics["layer_count"],
+            "raft_layer_count": statistics["raft_layer_count"],
+            "extrusion": statistics["extrusion"],
+            "print_distance": statistics["print_distance"],
+            "travel_distance": statistics["travel_distance"],
+            "seconds": statistics["seconds"],
+        }
+
+# 読めない・解析できないファイルは {"path", "error"} にして、ほかのファイルの集計を続ける
+def _analyze_job(path, use_index):
+    try:
+        return analyze_file(path, use_index)
+    except (OSError, ValueError) as error:
+        return {"path": path, "error": f"{type(error).__name__}: {error}"}
+
+# ディレクトリ以下の G-code をプロセスプールでまとめて集計する（失敗したファイルは "error" の入った結果になる）
+def analyze_directory(directory, processes=None, use_index=True):
+    paths = sorted(glob.glob(os.path.join(directory, '**', '*.gcode'), recursive=True))
+    if processes == 1:
+        return [_analyze_job(path, use_index) for path in paths]
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(_analyze_job, paths, [use_index] * len(paths)))
+
+if __name__ == '__main__':
+    # 引数のディレクトリ（省略するとこのファイルのあるディレクトリ）の G-code を一覧にする
+    directories = sys.argv[1:] or [os.path.dirname(os.path.abspath(__file__))]
+    print(f"{'ファイル':40s} {'層':>4s} {'時間(ヘッダ)':>12s} {'推定':>8s} {'フィラメント(ヘッダ)':>20s} {'押し出し(正味)':>10s} "
+          f"{'印刷距離':>10s} {'移動距離':>10s}")
+    for directory in directories:
+        for result in analyze_directory(directory):
+            if "error" in result:
+                print(f"{os.path.relpath(result['path'], directory):40s} 解析できません: {result['error']}")
+                continue
+            header = result["header"]
+            print(f"{os.path.relpath(result['path'], directory):40s} {result['layer_count']:4d} "
+                  f"{header.get('Print time', '-'):>12s} {result['seconds'] / 60:6.1f}分 "
+                  f"{header.get('Filament used', '-'):>20s} {result['extrusion'] / 1000:8.2f} m "
+                  f"{result['print_distance'] / 1000:8.1f} m {result['travel_distance'] / 1000:8.1f} m")
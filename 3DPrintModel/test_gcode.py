@@ -0,0 +1,21 @@
+import numpy as np
+
+import gcode
+
+# 語順が Cura と違う行も、同じ値を F X Y Z E F の列に読む
+def test_parse_moves_reordered():
+    buffer = b'G1 X0.1 Y20 Z0.3 F5000.0 E15\nG1 F5000.0 X0.1 Y20 Z0.3 E15 $3\n'
+    codes, values = gcode.parse_moves(buffer, 0, len(buffer))
+    assert codes.tolist() == [gcode.G1, gcode.G1]
+    np.testing.assert_array_equal(values[0], values[1])
+    np.testing.assert_array_equal(values[0, :5], [5000.0, 0.1, 20.0, 0.3, 15.0])
+
+# 並べ替えた行の押し出しと送り速度も統計に入る
+def test_statistics_reordered(tmp_path):
+    path = tmp_path / 'reordered.gcode'
+    path.write_bytes(b';LAYER:0\nG92 E0\nG1 Y10 E1 F600 ;comment\nG1 E2 X10\n')
+    with gcode.GcodeFile(str(path), use_index=False) as file:
+        statistics = file.statistics()
+    assert statistics["extrusion"] == 2.0
+    assert statistics["print_distance"] == 20.0
+    assert statistics["seconds"] == 2.0
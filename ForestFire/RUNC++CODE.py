@@ -1,11 +1,16 @@
-import subprocess
 import os
+import sys
+
+# flame ディレクトリの共通モジュールを読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'flame'))
+from cppbuild import run, DEFAULT_FLAGS
 
 # ディレクトリとファイル名の入力を想定したフルパス
 directory_path = input("フルパス（例: C:\\path\\to\\your_file.cpp）を入力してください: ")
 directory_path = directory_path.strip('"')
-# インクルードパスを指定（例: Eigen のパスを指定）
+# インクルードパスを指定（例: SFML のパス、存在する場合だけ -I に渡す）
 include_path = r"C:\Users\NKJ-M\Downloads\SFML-2.6.1"
+include_dirs = [include_path] if os.path.isdir(include_path) else []
 # os.path を使ってディレクトリパスとファイル名を分離
 path, file_name_with_ext = os.path.split(directory_path)  # ディレクトリパスとファイル名＋拡張子を分離
 file_name, ext = os.path.splitext(file_name_with_ext)  # ファイル名と拡張子を分離
@@ -15,34 +20,35 @@ print(f"ディレクトリパス: {path}")
 print(f"ファイル名: {file_name}")
 print(f"拡張子: {ext}")
 
+# Windows では MinGW の g++ を PATH に追加する（Linux では PATH 上の g++ / clang++ を使う）
+if sys.platform == 'win32':
+    gpp_path = r'C:\mingw64\bin'  # 必要な場合は MinGW のパスを指定
+    os.environ['PATH'] = os.environ['PATH'] + os.pathsep + gpp_path
 
+print(f"コンパイルフラグ: {' '.join(DEFAULT_FLAGS)}")
 
-# 環境変数 PATH に g++ のパスを追加（例: MinGW のパスを追加）
-gpp_path = r'C:\mingw64\bin'  # 必要な場合は MinGW のパスを指定
-os.environ['PATH'] = os.environ['PATH'] + ';' + gpp_path
-
-# 実行したい g++ コマンドを構築
-convert_exe_file = f'g++ -I {include_path} {file_name_with_ext} -o {file_name}.exe'
-run_exe_file = f'{file_name}.exe'
-
-print(f"コンパイルコマンド: {convert_exe_file}")
-
-def run_command(command, path):
+def run_command(source, path):
     #  ディレクトリの存在確認
     if os.path.isdir(path):
         try:
-            # subprocess.run を使用して、指定ディレクトリでコマンドを実行
-            result = subprocess.run(['cmd.exe', '/c', command], cwd=path, capture_output=True, text=True)
-
-            if result.stdout:
+            # ソースが変わっていなければキャッシュした実行ファイルをそのまま使い、指定ディレクトリで実行
+            result = run(source, path, include_dirs=include_dirs)
+            if result["cached"]:
+                print(f"キャッシュを使用: {result['binary']}")
+            else:
+                print(f"コンパイル: {result['binary']} ({result['compile_time']:.2f} 秒)")
+
+            if result["stdout"]:
                 # コマンドの標準出力を表示
                 print("=== 標準出力 ===")
-                print(result.stdout)
+                print(result["stdout"])
 
             # エラー出力があれば表示
-            if result.stderr:
+            if result["stderr"]:
                 print("=== エラー出力 ===")
-                print(result.stderr)
+                print(result["stderr"])
+
+            print(f"実行時間: {result['run_time']:.3f} 秒")
 
         except Exception as e:
             print(f"エラーが発生しました: {e}")
@@ -50,5 +56,4 @@ def run_command(command, path):
         print(f"指定されたディレクトリが存在しません: {path}")
 
 
-run_command(convert_exe_file, path)
-run_command(run_exe_file, path)
\ No newline at end of file
+run_command(directory_path, path)
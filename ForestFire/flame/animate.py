@@ -1,79 +1,156 @@
-import struct
+import queue
+import threading
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.colors import ListedColormap
-
-# 素材の種類を定義
-AIR = 0
-SOIL = 1
-WOOD = 2
-LEAF = 3
-DRY_LEAF = 4
-MATERIAL_COUNT = 5
-
-# セル構造を定義
-class Cell:
-    def __init__(self, state=0, material=0, energy=0.0, time=0.0):
-        self.state = state
-        self.material = material
-        self.energy = energy
-        self.time = time
-
-# アニメーションのための関数
+from matplotlib.animation import FuncAnimation
+from matplotlib.colors import ListedColormap, Normalize
+
+from cells import MATERIAL_COUNT, STATE_COUNT, material_colors, state_colors, map_cells, MappedSteps
+from trajectory import TrajectoryReader
+from stream import stream_process
+
+# アニメーションのための関数（ファイルをメモリマップし、Python でのアンパックをしない）
 def load_cells_from_file(filename, width, height):
-    cells = np.empty((width, height), dtype=Cell)
-    with open(filename, 'rb') as file:
-        for x in range(width):
-            for y in range(height):
-                data = file.read(16)  # 4つのfloat（4バイト×4）= 16バイト
-                if len(data) == 16:
-                    state, material, energy, time = struct.unpack('4f', data)
-                    cells[x, y] = Cell(state=int(state), material=int(material), energy=energy, time=time)
-    return cells
-
-# 素材ごとの色を設定
-material_colors = {
-    AIR: 'skyblue',  # 空気
-    SOIL: 'black',  # 土
-    WOOD: 'brown',  # 木
-    LEAF: 'green',  # 葉
-    DRY_LEAF: 'yellow',  # 枯れ葉
-}
+    return map_cells(filename, width, height)
 
 # カラーマップを作成
-colors = [material_colors[i] for i in range(5)]
+colors = [material_colors[i] for i in range(MATERIAL_COUNT)]
 cmap = ListedColormap(colors)
 
-# アニメーションを描画する関数
-def animate_cells(filename_format, width, height, steps):
+# 色分けに使うフィールドごとのカラーマップと値の範囲（energy の上限は None なら最後のステップから決める）
+def field_colormap(field, vmax=None):
+    if field == 'material':
+        return cmap, Normalize(0, MATERIAL_COUNT - 1)
+    if field == 'state':
+        return ListedColormap([state_colors[i] for i in range(STATE_COUNT)]), Normalize(0, STATE_COUNT - 1)
+    if field == 'energy':
+        return plt.get_cmap('inferno'), Normalize(0, vmax)
+    raise ValueError(f"色分けできないフィールドです: {field}")
+
+# 軌跡ファイル（.traj）か、全ステップ分のファイルをまとめてメモリマップしたもの（読み込みはアクセス時）
+def open_frames(filename_format, width, height, steps):
+    if filename_format.endswith('.traj'):
+        return TrajectoryReader(filename_format)
+    return MappedSteps(filename_format, width, height, steps)
+
+# 別スレッドで次のフレームを先読みし、描画中にディスクの読み込みを進める
+# 先読みと違う順番（巻き戻しや保存のやり直し）で要求されたステップはその場で読む
+class FramePrefetcher:
+    def __init__(self, frames, field, steps, depth=8):
+        self.frames = frames
+        self.field = field
+        self.steps = steps
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(depth)
+        self._expected = 0
+        self._thread = threading.Thread(target=self._read_ahead, daemon=True)
+        self._thread.start()
+
+    def _read(self, step):
+        with self._lock:
+            return np.array(self.frames[step][self.field])
+
+    def _read_ahead(self):
+        for step in range(self.steps):
+            self._queue.put(self._read(step))
+
+    def get(self, step):
+        if step == self._expected:
+            self._expected += 1
+            return self._queue.get()
+        return self._read(step)
+
+# 図と、ステップ番号を受け取ってそのフレームを表示する update(step) を作る（アニメーションにせず1フレームずつ描くときにも使う）
+# AxesImage を1回だけ作り、以降は用意したバッファを set_data で書き換える
+def cells_view(frames, steps=None, field='material', vmax=None):
+    steps = len(frames) if steps is None else min(steps, len(frames))
+    first = frames[0][field]
+    width, height = first.shape
+    if field == 'energy' and vmax is None:
+        vmax = max(float(np.max(frames[steps - 1]['energy'])), 1.0)
+    field_cmap, norm = field_colormap(field, vmax)
+
     fig, ax = plt.subplots(figsize=(8, 6))
-    
-    for step in range(steps):
-        # セルデータを読み込み
-        filename = filename_format.format(step + 1)  # ファイル名を動的に作成
-        cells = load_cells_from_file(filename, width, height)
-
-        # 素材ごとに色をつけるためのレイヤーを作成
-        material_layer = np.zeros((width, height), dtype=int)
-        for x in range(width):
-            for y in range(height):
-                material_layer[x, y] = cells[x, y].material
-
-        # セルを描画（素材を可視化）
-        ax.clear()
-        ax.imshow(material_layer.T, cmap=cmap, origin='lower')  # 転置して表示
-        ax.set_title(f'Step {step + 1}')
-        ax.set_xticks([])  # x軸の目盛りを非表示
-        ax.set_yticks([])  # y軸の目盛りを非表示
-        plt.pause(0.1)  # 0.1秒の間隔で更新
+    buffer = np.empty((height, width), dtype=np.float32)  # 転置して表示するので (height, width)
+    np.copyto(buffer, first.T)
+    image = ax.imshow(buffer, cmap=field_cmap, norm=norm, origin='lower', animated=True)
+    label = ax.text(0.02, 0.95, '', transform=ax.transAxes, color='white',
+                    bbox={'facecolor': 'black', 'alpha': 0.5}, animated=True)
+    ax.set_xticks([])  # x軸の目盛りを非表示
+    ax.set_yticks([])  # y軸の目盛りを非表示
+    prefetcher = FramePrefetcher(frames, field, steps)
+
+    def init():
+        return image, label
+
+    def update(step):
+        np.copyto(buffer, prefetcher.get(step).T)
+        image.set_data(buffer)
+        label.set_text(f'Step {step + 1}')
+        return image, label
+
+    return fig, update, init, steps
+
+# cells_view の図を FuncAnimation で再生する（blit で変わった部分だけ再描画する）
+def play_cells(frames, steps=None, field='material', interval=100, vmax=None):
+    fig, update, init, steps = cells_view(frames, steps, field, vmax)
+    animation = FuncAnimation(fig, update, frames=steps, init_func=init, interval=interval, blit=True,
+                              repeat=False)
+    return fig, animation
+
+# stream.py のジェネレーター（(ステップ番号, セル) を届いた順に返すもの）を、届くそばから表示する
+# 先のステップは読めないので、energy の上限 vmax が None ならそれまでの最大値に合わせて広げていく
+def play_stream(frames, field='material', interval=50, vmax=None):
+    step, cells = next(frames)
+    width, height = cells.shape
+    field_cmap, norm = field_colormap(field, vmax or 1.0)
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    buffer = np.empty((height, width), dtype=np.float32)  # 転置して表示するので (height, width)
+    np.copyto(buffer, cells[field].T)
+    image = ax.imshow(buffer, cmap=field_cmap, norm=norm, origin='lower', animated=True)
+    label = ax.text(0.02, 0.95, f'Step {step}', transform=ax.transAxes, color='white',
+                    bbox={'facecolor': 'black', 'alpha': 0.5}, animated=True)
+    ax.set_xticks([])  # x軸の目盛りを非表示
+    ax.set_yticks([])  # y軸の目盛りを非表示
+
+    def init():
+        return image, label
+
+    def update(frame):
+        step, cells = frame
+        np.copyto(buffer, cells[field].T)
+        if field == 'energy' and vmax is None:
+            norm.vmax = max(norm.vmax, float(buffer.max()))
+        image.set_data(buffer)
+        label.set_text(f'Step {step}')
+        return image, label
+
+    animation = FuncAnimation(fig, update, frames=frames, init_func=init, interval=interval, blit=True,
+                              repeat=False, cache_frame_data=False)
+    return fig, animation
+
+# アニメーションを描画する関数
+def animate_cells(filename_format, width, height, steps, field='material', interval=100):
+    frames = open_frames(filename_format, width, height, steps)
+    fig, animation = play_cells(frames, steps, field, interval)
+    plt.show()
+    return animation
 
+# シミュレーター（例: ['./system', '--stream']）を起動し、ファイルを書かずに実行中のステップを表示する
+# 表示が追いつかないときは古いフレームを捨てる
+def animate_stream(command, cwd=None, field='material', interval=50):
+    frames = stream_process(command, cwd, drop=True)
+    fig, animation = play_stream(frames, field, interval)
     plt.show()
+    return animation
 
-# ファイル名のフォーマットとステップ数
-filename_format = 'flame/cells_state_step_{}.bin'
-width = 150
-height = 100
-steps = 100  # 100ステップのアニメーション
+if __name__ == '__main__':
+    # ファイル名のフォーマットとステップ数
+    filename_format = 'flame/cells_state_step_{}.bin'
+    width = 150
+    height = 100
+    steps = 100  # 100ステップのアニメーション
 
-# アニメーションを実行
-animate_cells(filename_format, width, height, steps)
+    # アニメーションを実行
+    animate_cells(filename_format, width, height, steps)
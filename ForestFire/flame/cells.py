@@ -0,0 +1,173 @@
+import collections
+import numpy as np
+
+# 素材の種類を定義
+AIR = 0
+SOIL = 1
+WOOD = 2
+LEAF = 3
+DRY_LEAF = 4
+MATERIAL_COUNT = 5
+
+# 状態
+NORMAL = 0
+BURNING = 1
+BURNED = 2
+STATE_COUNT = 3
+
+# 自然環境条件
+environment = {"windSpeed": 0.0, "windDirection": 0.0}  # 風速 [m/s]、風向 [度]（0 で +x 向き）
+
+# 素材のプロパティ（system.cpp と同じ値）
+materialProperties = [
+    {"t": 0.0, "I_0": float('inf'), "I_1": float('inf'), "E_out": [0.0, 0.0, 0.0]},  # AIR
+    {"t": 0.0, "I_0": float('inf'), "I_1": float('inf'), "E_out": [0.0, 0.0, 0.0]},  # SOIL
+    {"t": 20.0, "I_0": 5000.0, "I_1": 16000.0, "E_out": [0.0, 2000.0, 0.0]},  # WOOD
+    {"t": 1.0, "I_0": 5000.0, "I_1": 16000.0, "E_out": [0.0, 2000.0, 0.0]},  # LEAF
+    {"t": 1.0, "I_0": 5000.0, "I_1": 16000.0, "E_out": [0.0, 2000.0, 0.0]},  # DRY_LEAF
+]
+
+# 素材ごとの色を設定
+material_colors = {
+    AIR: 'skyblue',  # 空気
+    SOIL: 'black',  # 土
+    WOOD: 'brown',  # 木
+    LEAF: 'green',  # 葉
+    DRY_LEAF: 'yellow',  # 枯れ葉
+}
+
+# 状態ごとの色
+state_colors = {
+    NORMAL: 'lightgray',  # 通常
+    BURNING: 'red',  # 燃焼中
+    BURNED: 'dimgray',  # 燃焼後
+}
+
+# セル1つ分のバイナリ形式（system.cpp の struct Cell と同じ <4f）
+CELL_DTYPE = np.dtype([
+    ('state', '<f4'),
+    ('material', '<f4'),
+    ('energy', '<f4'),
+    ('time', '<f4'),
+])
+
+# バイナリファイルからセルを (width, height) の構造化配列として読み込む
+def read_cells(filename, width, height):
+    cells = np.fromfile(filename, dtype=CELL_DTYPE, count=width * height)
+    if cells.size != width * height:
+        raise ValueError(f"{filename} には {width}x{height} セル分のデータがありません")
+    return cells.reshape(width, height)
+
+# バイナリファイルをメモリマップし、コピーせずに (width, height) の構造化配列として扱う
+# （cells['material'] などのフィールドもコピーなしのビューになる）
+def map_cells(filename, width, height, mode='r'):
+    return np.memmap(filename, dtype=CELL_DTYPE, mode=mode, shape=(width, height))
+
+MAP_CACHE_SIZE = 16
+
+# 複数ステップ分のファイルをまとめて (steps, width, height) の配列のように扱う
+# ファイルは実際にアクセスしたステップだけがメモリマップされる
+# マップは1つごとにファイルを開いたままにするので、最近使った cache_size 個だけを残す
+class MappedSteps:
+    def __init__(self, filename_format, width, height, steps, start=1, cache_size=MAP_CACHE_SIZE):
+        self.filename_format = filename_format
+        self.width = width
+        self.height = height
+        self.steps = steps
+        self.start = start
+        self.shape = (steps, width, height)
+        self.cache_size = cache_size
+        self._maps = collections.OrderedDict()
+
+    def __len__(self):
+        return self.steps
+
+    # ステップ番号ではなく 0 から数えた位置で指定する
+    def step(self, index):
+        if index < 0:
+            index += self.steps
+        if not 0 <= index < self.steps:
+            raise IndexError(f"ステップ {index} は範囲外です")
+        if index in self._maps:
+            self._maps.move_to_end(index)
+            return self._maps[index]
+        filename = self.filename_format.format(self.start + index)
+        cells = self._maps[index] = map_cells(filename, self.width, self.height)
+        if len(self._maps) > self.cache_size:
+            self._maps.popitem(last=False)
+        return cells
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            step_index, rest = index[0], index[1:]
+        else:
+            step_index, rest = index, ()
+        if isinstance(step_index, slice):
+            # 複数ステップの指定はその部分だけを読み込んで積み重ねる
+            return self._stack(range(*step_index.indices(self.steps)), lambda cells: cells[rest])
+        return self.step(step_index)[rest]
+
+    def __iter__(self):
+        for index in range(self.steps):
+            yield self.step(index)
+
+    # 1つのフィールドを全ステップ分 (steps, width, height) で取り出す
+    def field(self, name, steps=slice(None)):
+        return self._stack(range(*steps.indices(self.steps)), lambda cells: cells[name])
+
+    # 各ステップから select で取り出した部分を、1ステップずつ新しい配列に写す
+    # （全ステップのビューを同時に持つとマップが閉じられず、ファイルを開いたままになる）
+    def _stack(self, indices, select):
+        result = None
+        for position, index in enumerate(indices):
+            part = select(self.step(index))
+            if result is None:
+                result = np.empty((len(indices),) + part.shape, dtype=part.dtype)
+            result[position] = part
+        return result if result is not None else np.stack([])
+
+# 構造化配列をバイナリファイルに保存（x が外側、y が内側の順）
+def write_cells(filename, cells):
+    np.ascontiguousarray(cells, dtype=CELL_DTYPE).tofile(filename)
+
+# セルの格子（Cell オブジェクトの配列の代わりに <4f の構造化配列1つで保持する）
+class CellGrid:
+    def __init__(self, width, height, cells=None):
+        if cells is None:
+            cells = np.zeros((width, height), dtype=CELL_DTYPE)
+        elif cells.shape != (width, height) or cells.dtype != CELL_DTYPE:
+            raise ValueError(f"cells は ({width}, {height}) の CELL_DTYPE 配列である必要があります")
+        self.width = width
+        self.height = height
+        self.cells = cells
+
+    @classmethod
+    def from_file(cls, filename, width, height):
+        return cls(width, height, read_cells(filename, width, height))
+
+    # 各フィールドはコピーせずにビューとして返す（書き込むと格子に反映される）
+    @property
+    def state(self):
+        return self.cells['state']
+
+    @property
+    def material(self):
+        return self.cells['material']
+
+    @property
+    def energy(self):
+        return self.cells['energy']
+
+    @property
+    def time(self):
+        return self.cells['time']
+
+    # region（スライスのタプル・ブールマスク・インデックス配列）のセルをまとめて設定する
+    def fill(self, region, material, state=NORMAL, energy=0.0, time=0.0):
+        self.cells[region] = (state, material, energy, time)
+
+    def __getitem__(self, region):
+        return self.cells[region]
+
+    def save(self, filename):
+        write_cells(filename, self.cells)
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# C++ のソースをコンパイルして実行する
+# 実行ファイルは「ソースとインクルードするヘッダ・フラグ・コンパイラのバージョン・ビルドしたマシンの CPU」のハッシュを
+# 名前にしてキャッシュし、何も変わっていなければ再コンパイルしない
+# （-march=native のバイナリは別の CPU では動かないことがあるので、キャッシュを複数のマシンで共有しても混ざらないようにする）
+
+# 既定の最適化フラグ（-ffp-contract=off で FMA への置き換えを止め、fire.py と同じ丸めの結果にする）
+DEFAULT_FLAGS = ['-O3', '-march=native', '-ffp-contract=off']
+OPENMP_FLAGS = ['-fopenmp']
+
+# キャッシュを置くディレクトリ（環境変数 FORESTFIRE_BUILD_CACHE、なければ ~/.cache/forestfire）
+def cache_directory():
+    default = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'forestfire')
+    return os.environ.get('FORESTFIRE_BUILD_CACHE', default)
+
+# 使うコンパイラ: 環境変数 CXX、なければ PATH 上の g++ か clang++
+def find_compiler():
+    for compiler in [os.environ.get('CXX'), 'g++', 'clang++']:
+        if compiler and shutil.which(compiler):
+            return shutil.which(compiler)
+    raise RuntimeError("C++ コンパイラ（g++ または clang++）が見つかりません")
+
+# コンパイラの --version の出力（キャッシュのキーに含める）
+def compiler_version(compiler):
+    return subprocess.run([compiler, '--version'], capture_output=True, text=True, check=True).stdout
+
+# ソースと、ソースがインクルードするヘッダ（システムのヘッダを除く）のパスの一覧
+# コンパイラの -MM で求め、使えなければ source と -I のディレクトリの下のファイルすべてにする
+def dependencies(source, flags, compiler):
+    result = subprocess.run([compiler, *flags, '-MM', source], capture_output=True, text=True)
+    if result.returncode == 0:
+        # 「system.o: system.cpp a.h \」の形（行末の \ は行の続き、パスの中の空白は \ で逃がしてある）
+        rule = result.stdout.replace('\\\n', ' ').split(':', 1)[-1]
+        return [path.replace('\\ ', ' ') for path in re.split(r'(?<!\\)\s+', rule.strip()) if path]
+    paths = [source]
+    for flag in flags:
+        if flag.startswith('-I'):
+            for root, _, files in os.walk(flag[2:]):
+                paths += sorted(os.path.join(root, name) for name in files)
+    return paths
+
+# コンパイラが -march=native などで実際に使う CPU の設定（キャッシュのキーに含める）
+# g++ は -Q --help=target、clang++ は -### の -target-cpu / -target-feature から求める
+def target_description(compiler, flags):
+    machine_flags = [flag for flag in flags if flag.startswith('-m')]
+    description = platform.machine()
+    if not any('native' in flag for flag in machine_flags):
+        return description + '\0' + '\0'.join(machine_flags)
+    result = subprocess.run([compiler, *machine_flags, '-Q', '--help=target'], capture_output=True, text=True)
+    if result.returncode == 0 and result.stdout:
+        return description + '\0' + result.stdout
+    result = subprocess.run([compiler, *machine_flags, '-###', '-x', 'c++', '-c', os.devnull],
+                            capture_output=True, text=True)
+    return description + '\0' + ' '.join(re.findall(r'"-target-(?:cpu|feature)" "([^"]+)"', result.stderr))
+
+# ソースとヘッダ・フラグ・コンパイラのバージョン・CPU から決まるキャッシュのキー
+def build_key(source, flags, compiler):
+    digest = hashlib.sha256()
+    for path in dependencies(source, flags, compiler):
+        digest.update(path.encode('utf-8') + b'\0')
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+    digest.update('\0'.join(flags).encode('utf-8'))
+    digest.update(compiler_version(compiler).encode('utf-8'))
+    digest.update(target_description(compiler, flags).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+# source をコンパイルし、(実行ファイルのパス, キャッシュを使ったか, コンパイル時間 [s]) を返す
+# include_dirs は -I に渡すディレクトリ、openmp=True なら -fopenmp を付ける
+def build(source, flags=None, openmp=False, include_dirs=(), compiler=None, cache_dir=None):
+    compiler = compiler or find_compiler()
+    flags = list(DEFAULT_FLAGS if flags is None else flags)
+    flags += OPENMP_FLAGS if openmp else []
+    flags += [f'-I{directory}' for directory in include_dirs]
+    cache_dir = cache_dir or cache_directory()
+    os.makedirs(cache_dir, exist_ok=True)
+
+    name = os.path.splitext(os.path.basename(source))[0]
+    suffix = '.exe' if sys.platform == 'win32' else ''
+    binary = os.path.join(cache_dir, f'{name}-{build_key(source, flags, compiler)}{suffix}')
+    if os.path.exists(binary):
+        return binary, True, 0.0
+
+    # 途中で止まっても壊れたファイルがキャッシュに残らないよう、一時ファイルに書いてから名前を変える
+    handle, temporary = tempfile.mkstemp(suffix=suffix, dir=cache_dir)
+    os.close(handle)
+    start = time.perf_counter()
+    result = subprocess.run([compiler, *flags, source, '-o', temporary], capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        os.remove(temporary)
+        raise RuntimeError(f"コンパイルに失敗しました: {source}\n{result.stderr}")
+    os.replace(temporary, binary)
+    return binary, False, elapsed
+
+# source をビルドして workdir で実行し、結果と時間を辞書で返す
+def run(source, workdir, args=(), flags=None, openmp=False, include_dirs=(), compiler=None, cache_dir=None,
+        threads=None):
+    binary, cached, compile_time = build(source, flags, openmp, include_dirs, compiler, cache_dir)
+    env = dict(os.environ, OMP_NUM_THREADS=str(threads)) if threads else None
+    start = time.perf_counter()
+    result = subprocess.run([binary, *args], cwd=workdir, capture_output=True, text=True, env=env)
+    run_time = time.perf_counter() - start
+    return {
+        "binary": binary,
+        "cached": cached,
+        "compile_time": compile_time,
+        "run_time": run_time,
+        "returncode": result.returncode,
+        "stdout": result.stdout,
+        "stderr": result.stderr,
+    }
+
+if __name__ == '__main__':
+    # 使い方: python cppbuild.py <ソース.cpp> [作業ディレクトリ]
+    source = os.path.abspath(sys.argv[1])
+    workdir = sys.argv[2] if len(sys.argv) > 2 else os.path.dirname(source)
+    result = run(source, workdir)
+    print(f"{'キャッシュ' if result['cached'] else 'コンパイル'}: {result['binary']} ({result['compile_time']:.2f} s)")
+    print(f"実行時間: {result['run_time']:.3f} s (終了コード {result['returncode']})")
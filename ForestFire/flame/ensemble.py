@@ -0,0 +1,133 @@
+import numpy as np
+
+from cells import NORMAL, BURNING, BURNED, STATE_COUNT, CELL_DTYPE, materialProperties
+from fire import FireSimulation, material_table
+
+# properties の一部の値を差し替えたコピーを作る（例: with_properties(materialProperties, WOOD, t=30.0)）
+def with_properties(properties, material, **values):
+    properties = [dict(p, E_out=list(p["E_out"])) for p in properties]
+    properties[material].update(values)
+    return properties
+
+# K 個のシーンを x 方向に空気の列を1本ずつ挟んで並べ、1つの格子としてまとめて進める
+# 空気の列は燃えずエネルギーも出さないので、走査順の連鎖発火も含めてメンバー同士は影響し合わず、
+# 各メンバーの結果は単独で FireSimulation を動かした場合と同じになる
+# 素材の定数はメンバーごとに properties[k] から引く
+class EnsembleSimulation(FireSimulation):
+    def __init__(self, scenes, properties=None, frontier=False):
+        scenes = np.asarray(scenes, dtype=CELL_DTYPE)
+        if properties is None:
+            properties = [materialProperties] * (len(scenes) if scenes.ndim == 3 else 1)
+        if scenes.ndim == 2:
+            scenes = np.broadcast_to(scenes, (len(properties),) + scenes.shape)
+        if len(scenes) != len(properties):
+            raise ValueError(f"シーンの数 {len(scenes)} と properties の数 {len(properties)} が一致しません")
+
+        self.members = len(scenes)
+        self.member_width, self.member_height = scenes.shape[1:]
+        self.member_tables = [material_table(p) for p in properties]
+
+        stride = self.member_width + 1
+        combined = np.zeros((self.members * stride - 1, self.member_height), dtype=CELL_DTYPE)
+        for k, scene in enumerate(scenes):
+            combined[k * stride:k * stride + self.member_width] = scene
+        super().__init__(combined, properties[0], frontier)
+
+        # メンバーごとの (K, width, height) ビュー
+        self.member_state = self._member_view(self._state)
+        self.member_energy = self._member_view(self._energy)
+        self.member_time = self._member_view(self._time)
+        self.member_material = self._member_view(self._material)
+
+        # 着火点（最初に燃えているセルの重心）と、火が消えたステップ（まだなら -1）
+        self.origins = np.full((self.members, 2), np.nan)
+        for k, state in enumerate(self.member_state):
+            burning = np.argwhere(state == BURNING)
+            if burning.size:
+                self.origins[k] = burning.mean(axis=0)
+        self.extinction_step = np.full(self.members, -1)
+        self.burning_history = []
+
+    def _member_view(self, padded):
+        stride = self.member_width + 1
+        members = padded[1:1 + self.members * stride].reshape(self.members, stride, -1)
+        return members[:, :self.member_width, 1:-1]
+
+    # メンバーごとの素材テーブルを1つにつなげ、セルごとに自分のメンバーの定数を引く
+    # （最後の1行は区切りの列と枠のためのもので、燃えずエネルギーも出さない）
+    def _lookup_material_constants(self, material):
+        rows = len(self.member_tables[0]["t"])
+        tables = self.member_tables
+        burn_time = np.concatenate([table["t"] for table in tables] + [[0.0]]).astype(np.float32)
+        ignite_energy = np.concatenate([table["I_0"] for table in tables] + [[np.inf]]).astype(np.float32)
+        self_ignite_energy = np.concatenate([table["I_1"] for table in tables] + [[np.inf]]).astype(np.float32)
+        emit_table = np.concatenate([table["E_out"].ravel() for table in tables] + [np.zeros(STATE_COUNT)])
+
+        x = np.arange(material.shape[0]) - 1
+        member = x // (self.member_width + 1)
+        separator = (x < 0) | (x % (self.member_width + 1) == self.member_width) | (member >= self.members)
+        row = (member * rows)[:, None] + material
+        row[separator] = self.members * rows
+
+        self._burn_time = burn_time[row]
+        self._ignite_energy = ignite_energy[row]
+        self._self_ignite_energy = self_ignite_energy[row]
+        self._emit_index = row * STATE_COUNT
+        self._emit_table = emit_table.astype(np.float32)
+
+    # メンバーごとの燃焼中のセル数
+    def burning_counts(self):
+        if self.frontier:
+            x = self._burning_cells // (self.height + 2) - 1
+            return np.bincount(x // (self.member_width + 1), minlength=self.members)
+        return (self.member_state == BURNING).sum(axis=(1, 2))
+
+    def step(self):
+        super().step()
+        burning = self.burning_counts()
+        self.burning_history.append(burning)
+        self.extinction_step[(burning == 0) & (self.extinction_step < 0)] = self.step_count
+
+    # 全メンバーの火が消えるか steps ステップに達するまで進め、集計結果を返す
+    def simulate(self, steps):
+        for _ in range(steps):
+            self.step()
+            if np.all(self.extinction_step >= 0):
+                break
+        return self.summary()
+
+    # メンバーごとの集計: 燃え尽きた面積、最大燃焼セル数、消火ステップ、延焼速度 [セル/ステップ]
+    def summary(self):
+        history = np.array(self.burning_history).reshape(-1, self.members)
+        xs = np.arange(self.member_width)[:, None]
+        ys = np.arange(self.member_height)[None, :]
+        results = []
+        for k, state in enumerate(self.member_state):
+            reached = (state == BURNING) | (state == BURNED)
+            elapsed = self.extinction_step[k] if self.extinction_step[k] >= 0 else self.step_count
+            front_speed = np.nan
+            if reached.any() and not np.isnan(self.origins[k, 0]) and elapsed > 0:
+                distance = np.hypot(xs - self.origins[k, 0], ys - self.origins[k, 1])
+                front_speed = distance[reached].max() / elapsed
+            results.append({
+                "burned_area": int((state == BURNED).sum()),
+                "peak_burning": int(history[:, k].max()) if len(history) else 0,
+                "extinction_step": int(self.extinction_step[k]),
+                "front_speed": float(front_speed),
+            })
+        return results
+
+if __name__ == '__main__':
+    import os
+    from cells import WOOD, read_cells
+
+    # cells_state.bin の木の根元に火をつけ、木の燃焼時間と発火定数を変えて比べる
+    directory = os.path.dirname(os.path.abspath(__file__))
+    scene = read_cells(os.path.join(directory, 'cells_state.bin'), 150, 100).copy()
+    scene['state'][38:43, 25:30] = np.where(scene['material'][38:43, 25:30] == WOOD, BURNING, NORMAL)
+
+    properties = [with_properties(materialProperties, WOOD, t=t, I_0=i_0)
+                  for t in (5.0, 20.0, 40.0) for i_0 in (2000.0, 5000.0)]
+    ensemble = EnsembleSimulation(scene, properties, frontier=True)
+    for p, result in zip(properties, ensemble.simulate(500)):
+        print(f"t={p[WOOD]['t']:5.1f} I_0={p[WOOD]['I_0']:7.1f}: {result}")
@@ -0,0 +1,260 @@
+import heapq
+import numpy as np
+
+from cells import NORMAL, BURNING, BURNED, materialProperties, read_cells
+from fire import FireSimulation
+
+# float32 の足し算が丸めなしで計算できる整数の範囲
+EXACT_LIMIT = 2.0 ** 24
+
+# value に rate を k 回足した値（float32 で1回ずつ足した場合と同じ結果）
+# 整数どうしで 2^24 を超えなければ value + k * rate で一度に求め、それ以外は1回ずつ足す
+def accumulate(value, rate, k):
+    value = np.asarray(value, dtype=np.float32)
+    rate = np.broadcast_to(np.asarray(rate, dtype=np.float32), value.shape)
+    total = value.astype(np.float64) + k * rate.astype(np.float64)
+    exact = ((value == np.floor(value)) & (rate == np.floor(rate))
+             & (np.abs(value) + k * np.abs(rate) <= EXACT_LIMIT))
+    result = total.astype(np.float32)
+    rest = np.flatnonzero(~exact & (k > 0))
+    if rest.size:
+        v, r, n = value[rest].copy(), rate[rest], k[rest]
+        for i in range(n.max()):
+            np.add(v, r, out=v, where=i < n)
+        result[rest] = v
+    return result
+
+# value に rate（0 以上）を足していって初めて threshold 以上になるのは何回目か（1 以上、ならなければ -1）
+def first_reach(value, rate, threshold):
+    value = np.asarray(value, dtype=np.float32)
+    rate = np.broadcast_to(np.asarray(rate, dtype=np.float32), value.shape)
+    threshold = np.broadcast_to(np.asarray(threshold, dtype=np.float32), value.shape)
+    k = np.full(value.shape, -1, dtype=np.int64)
+    reached = value >= threshold
+    k[reached] = 1
+    open_ = ~reached & (rate > 0) & np.isfinite(threshold)
+
+    # 整数どうしなら割り算で求まる（到達するまでの途中の値もすべて float32 で正確に表せる）
+    v64, r64, t64 = value.astype(np.float64), rate.astype(np.float64), threshold.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        steps = np.maximum(np.ceil((t64 - v64) / r64), 1)
+        exact = (open_ & (value == np.floor(value)) & (rate == np.floor(rate))
+                 & (np.abs(v64) + steps * r64 <= EXACT_LIMIT))
+    k[exact] = steps[exact]
+
+    # それ以外は float32 で1回ずつ足して確かめる（足しても値が変わらなくなったら到達しない）
+    rest = np.flatnonzero(open_ & ~exact)
+    v, r, t = value[rest].copy(), rate[rest], threshold[rest]
+    count = 0
+    while rest.size:
+        count += 1
+        added = v + r
+        done = added >= t
+        k[rest[done]] = count
+        keep = ~done & (added != v)
+        rest, v, r, t = rest[keep], added[keep], r[keep], t[keep]
+    return k
+
+# イベント駆動のシミュレーション（結果は FireSimulation と全ステップで同じ）
+# 周囲の排出エネルギーが変わらない間、セルのエネルギーは一定の割合で増え、燃焼中のセルは燃焼時間が1ずつ増えるだけなので、
+# セルごとに「次に状態が変わりうるステップ」（燃え尽き・発火・発火候補になる）を計算してヒープに入れ、
+# そのステップのセルだけを処理する。何も起きないステップは飛ばすので、計算量はステップ数×セル数ではなくイベントの数で決まる。
+# エネルギーと燃焼時間はセルごとに最後に計算したステップの値だけを持ち、to_cells() などで必要になったときに進める
+class EventFireSimulation(FireSimulation):
+    _queue = None
+
+    def __init__(self, cells, properties=materialProperties, frontier=False):
+        if frontier:
+            raise ValueError("EventFireSimulation は frontier モードに対応していません")
+        super().__init__(cells, properties)
+        # エネルギーは減らない（E_out >= 0）ことを前提にしている
+        if np.any(self.table["E_out"] < 0):
+            raise ValueError("E_out は 0 以上である必要があります")
+        self._rebuild_events()
+
+    @classmethod
+    def from_file(cls, filename, width, height, properties=materialProperties, frontier=False):
+        return cls(read_cells(filename, width, height), properties, frontier)
+
+    # state や energy を外から書き換えたときは、先に sync() してから書き換え、その後で呼び出すこと
+    def refresh_emission(self, mask=None):
+        super().refresh_emission(mask)
+        if self._queue is not None:
+            self._rebuild_events()
+
+    # 現在の状態からイベントのヒープを作り直す
+    def _rebuild_events(self):
+        shape = self._state.shape
+        self._synced = np.full(shape, self.step_count, dtype=np.int64)  # エネルギーと燃焼時間を計算済みのステップ
+        self._rate = np.zeros(shape, dtype=np.float32)  # 1ステップに受け取るエネルギー
+        self._burning = self._state == BURNING
+        self._after = self._burning.copy()
+        self._armed = np.zeros(shape, dtype=bool)
+        self._scheduled = np.full(shape, -1, dtype=np.int64)  # 次に処理するステップ（なければ -1）
+        self._queue = {}
+        self._steps = []
+        cells = np.flatnonzero(self._inside)
+        self._update_rate(cells)
+        self._schedule(cells, self.step_count)
+
+    # cells の受け取るエネルギーを周囲8セルの排出エネルギーから求める（全セル版と同じ順番で足す）
+    def _update_rate(self, cells):
+        emit = self._emit.ravel()
+        rate = np.zeros(cells.size, dtype=np.float32)
+        for offset in self._neighbour_offsets:
+            rate += emit[cells + offset]
+        self._rate.ravel()[cells] = rate
+
+    # cells のエネルギーと燃焼時間をステップ step の値まで進める
+    def _sync(self, cells, step):
+        synced = self._synced.ravel()
+        k = step - synced[cells]
+        cells, k = cells[k > 0], k[k > 0]
+        if not cells.size:
+            return
+        energy = self._energy.ravel()
+        energy[cells] = accumulate(energy[cells], self._rate.ravel()[cells], k)
+        burning = (self._state.ravel()[cells] == BURNING) & self._combustible.ravel()[cells]
+        time = self._time.ravel()
+        time[cells[burning]] = accumulate(time[cells[burning]], 1.0, k[burning])
+        synced[cells] = step
+
+    # ステップ now まで計算済みの cells について、次に処理が必要なステップをヒープに入れる
+    #   燃焼中: 燃焼時間が t に達するステップ
+    #   通常で隣が燃えている: エネルギーが I_0 に達するステップ
+    #   通常で隣が燃えていない: I_0 に達するステップ（発火候補になる）、候補になった後は I_1 に達するステップ
+    def _schedule(self, cells, now):
+        state = self._state.ravel()[cells]
+        combustible = self._combustible.ravel()[cells]
+        k = np.full(cells.size, -1, dtype=np.int64)
+
+        burning = np.flatnonzero((state == BURNING) & combustible)
+        k[burning] = first_reach(self._time.ravel()[cells[burning]], 1.0, self._burn_time.ravel()[cells[burning]])
+
+        normal = np.flatnonzero((state == NORMAL) & combustible)
+        normal_cells = cells[normal]
+        has_burning_neighbour = np.zeros(normal.size, dtype=bool)
+        for offset in self._neighbour_offsets:
+            has_burning_neighbour |= self._burning.ravel()[normal_cells + offset]
+        threshold = np.where(has_burning_neighbour | ~self._armed.ravel()[normal_cells],
+                             self._ignite_energy.ravel()[normal_cells], self._self_ignite_energy.ravel()[normal_cells])
+        k[normal] = first_reach(self._energy.ravel()[normal_cells], self._rate.ravel()[normal_cells], threshold)
+
+        steps = np.where(k > 0, now + k, -1)
+        self._scheduled.ravel()[cells] = steps
+        order = np.argsort(steps, kind='stable')
+        steps, cells = steps[order], cells[order]
+        starts = np.flatnonzero(np.diff(steps, prepend=-2))
+        for start, end in zip(starts, np.append(starts[1:], steps.size)):
+            step = int(steps[start])
+            if step < 0:
+                continue
+            if step not in self._queue:
+                self._queue[step] = []
+                heapq.heappush(self._steps, step)
+            self._queue[step].append(cells[start:end])
+
+    # ステップ step に処理が必要なセル（後から別のステップに入れ直されたものは除く）
+    def _pop_events(self, step):
+        cells = np.unique(np.concatenate(self._queue.pop(step)))
+        return cells[self._scheduled.ravel()[cells] == step]
+
+    # イベントのあるステップ step を1つ処理する（発火判定は全セル版の if_ignite と同じ）
+    def _process(self, step):
+        events = self._pop_events(step)
+        self._sync(events, step)
+        state = self._state.ravel()
+        cell_state = state[events]
+        combustible = self._combustible.ravel()[events]
+        burning = cell_state == BURNING
+        burned_out = burning & combustible & (self._time.ravel()[events] >= self._burn_time.ravel()[events])
+
+        energy = self._energy.ravel()[events]
+        normal = (cell_state == NORMAL) & combustible
+        self_ignite = normal & (energy >= self._self_ignite_energy.ravel()[events])
+        candidate = normal & (energy >= self._ignite_energy.ravel()[events]) & ~self_ignite
+
+        # イベントのないセルはこのステップで燃焼状態が変わらないので、更新後の状態 _after は更新前と同じ
+        before = self._burning.ravel()
+        after = self._after.ravel()
+        after[events] = (burning & ~burned_out) | self_ignite
+        has_burning_neighbour = np.zeros(events.size, dtype=bool)
+        for offset in self._successor_offsets:
+            has_burning_neighbour |= before[events + offset]
+        for offset in self._predecessor_offsets:
+            has_burning_neighbour |= after[events + offset]
+        after[events] = burning
+
+        armed = self._armed.ravel()
+        armed[events] = candidate & ~has_burning_neighbour
+        ignited = events[self_ignite | (candidate & has_burning_neighbour)]
+        ignited = np.concatenate([ignited, self._chain_ignition(ignited, armed)])
+        burned = events[burned_out]
+        changed = np.concatenate([burned, ignited])
+
+        # 状態が変わるセルとその周囲は、受け取るエネルギーが変わる前にこのステップまで進めておく
+        affected = np.unique((changed[:, None] + self._around_offsets).ravel())
+        affected = affected[self._inside.ravel()[affected]]
+        self._sync(affected, step)
+
+        state[burned] = BURNED
+        state[ignited] = BURNING
+        before[burned] = after[burned] = False
+        before[ignited] = after[ignited] = True
+        emit = self._emit.ravel()
+        emit[changed] = self._emit_table[self._emit_index.ravel()[changed] + state[changed]]
+        self._update_rate(affected)
+        self._schedule(np.union1d(events, affected), step)
+
+    # ステップ step まで進める（途中のイベントのあるステップだけを処理する）
+    def advance_to(self, step):
+        while self._steps and self._steps[0] <= step:
+            self._process(heapq.heappop(self._steps))
+        self.step_count = max(self.step_count, step)
+
+    def step(self):
+        self.advance_to(self.step_count + 1)
+
+    # 全セルのエネルギーと燃焼時間を現在のステップまで進める（state・energy などの属性を読む前に呼ぶ）
+    def sync(self):
+        self._sync(np.flatnonzero(self._inside), self.step_count)
+
+    def to_cells(self):
+        self.sync()
+        return super().to_cells()
+
+    # 指定したステップ（昇順）の状態を順に返す。間のステップは計算しない
+    def snapshots(self, steps):
+        for step in steps:
+            if step < self.step_count:
+                raise ValueError(f"ステップ {step} はすでに過ぎています（現在 {self.step_count}）")
+            self.advance_to(step)
+            yield step, self.to_cells()
+
+    # 次に処理するステップ（なければ None。火が消えて、この先どのセルの状態も変わらない）
+    def next_event(self):
+        return self._steps[0] if self._steps else None
+
+if __name__ == '__main__':
+    import os
+    import time
+    from cells import WOOD
+
+    # 木の根元に火をつけ、全ステップを計算する場合と、いくつかのステップだけを取り出す場合を比べる
+    directory = os.path.dirname(os.path.abspath(__file__))
+    scene = read_cells(os.path.join(directory, 'cells_state.bin'), 150, 100).copy()
+    scene['state'][38:43, 25:30] = np.where(scene['material'][38:43, 25:30] == WOOD, BURNING, NORMAL)
+    steps = 500
+
+    start = time.perf_counter()
+    dense = FireSimulation(scene)
+    for _ in dense.run(steps):
+        pass
+    print(f"FireSimulation:      {time.perf_counter() - start:.3f} s")
+
+    start = time.perf_counter()
+    events = EventFireSimulation(scene)
+    for step, cells in events.snapshots(range(100, steps + 1, 100)):
+        pass
+    print(f"EventFireSimulation: {time.perf_counter() - start:.3f} s")
+    print("一致しました" if cells.tobytes() == dense.to_cells().tobytes() else "一致しませんでした")
@@ -0,0 +1,123 @@
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.colors import to_rgb
+from PIL import Image
+
+from cells import MATERIAL_COUNT, STATE_COUNT, material_colors, state_colors
+from trajectory import TrajectoryReader
+from animate import open_frames
+
+# matplotlib の図を使わずに、全ステップを GIF / APNG / MP4 に書き出す（ディスプレイのない環境向け）
+# 各フレームは「色番号の配列」にしてから、色番号 → RGB の uint8 テーブルを1回引くだけで画像にする
+
+ENERGY_LEVELS = 256
+
+# 色の名前の並びから (色の数, 3) の uint8 テーブルを作る
+def _color_table(names):
+    return np.array([np.round(np.array(to_rgb(name)) * 255) for name in names], dtype=np.uint8)
+
+# フィールドごとの色番号 → RGB テーブル
+def field_palette(field):
+    if field == 'material':
+        return _color_table([material_colors[i] for i in range(MATERIAL_COUNT)])
+    if field == 'state':
+        return _color_table([state_colors[i] for i in range(STATE_COUNT)])
+    if field == 'energy':
+        return (colormaps['inferno'](np.linspace(0, 1, ENERGY_LEVELS))[:, :3] * 255).round().astype(np.uint8)
+    raise ValueError(f"色分けできないフィールドです: {field}")
+
+# 1ステップ分のセルを (height, width) の色番号にする（animate と同じく y が上向きになるよう上下を反転）
+# energy は [0, vmax] を ENERGY_LEVELS 段階に分ける
+def frame_indices(cells, field, vmax=None):
+    values = cells[field]
+    if field == 'energy':
+        values = np.clip(values * ((ENERGY_LEVELS - 1) / vmax), 0, ENERGY_LEVELS - 1)
+    return values.T[::-1].astype(np.uint8)
+
+# 色番号の画像を RGB (height, width, 3) にする。scale 倍に拡大するときは各セルを scale x scale 画素にする
+def frame_rgb(indices, palette, scale=1):
+    if scale > 1:
+        indices = indices.repeat(scale, axis=0).repeat(scale, axis=1)
+    return palette[indices]
+
+# GIF と APNG はパレット画像（色番号 + パレット）のまま Pillow に渡し、フレームを順に書き込む
+def _write_pillow(path, indices, palette, scale, fps, format):
+    palette_bytes = palette.tobytes()
+
+    def image(index):
+        if scale > 1:
+            index = index.repeat(scale, axis=0).repeat(scale, axis=1)
+        frame = Image.frombytes('P', index.shape[::-1], index.tobytes())
+        frame.putpalette(palette_bytes)
+        return frame
+
+    frames = (image(index) for index in indices)
+    first = next(frames)
+    if format == 'PNG':
+        frames = list(frames)  # Pillow の APNG はフレームのリストしか受け付けない（GIF は1枚ずつ書き込む）
+    first.save(path, format=format, save_all=True, append_images=frames, duration=1000 / fps, loop=0)
+
+# MP4 は ffmpeg に RGB の生データをパイプで流し込む（幅と高さは偶数に切り詰める）
+def _write_ffmpeg(path, indices, palette, scale, fps, shape):
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError("MP4 の書き出しには ffmpeg が必要です")
+    height, width = shape[0] * scale // 2 * 2, shape[1] * scale // 2 * 2
+    command = [ffmpeg, '-loglevel', 'error', '-y', '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+               '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+               '-c:v', 'libx264', '-pix_fmt', 'yuv420p', path]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    try:
+        for index in indices:
+            process.stdin.write(frame_rgb(index, palette, scale)[:height, :width].tobytes())
+    finally:
+        process.stdin.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg が失敗しました: {path}")
+
+# 1回分の実行結果を画像・動画ファイルに書き出す。形式は output の拡張子（.gif / .png / .apng / .mp4）で決まる
+# energy の上限 vmax は None なら最後のステップの最大値を使う
+def export_run(filename_format, width, height, steps, output, field='material', fps=10, scale=1, vmax=None):
+    frames = open_frames(filename_format, width, height, steps)
+    steps = min(steps, len(frames))
+    if field == 'energy' and vmax is None:
+        vmax = max(float(np.max(frames[steps - 1]['energy'])), 1.0)
+    palette = field_palette(field)
+    indices = (frame_indices(frames[step], field, vmax) for step in range(steps))
+
+    extension = os.path.splitext(output)[1].lower()
+    try:
+        if extension == '.gif':
+            _write_pillow(output, indices, palette, scale, fps, 'GIF')
+        elif extension in ('.png', '.apng'):
+            _write_pillow(output, indices, palette, scale, fps, 'PNG')
+        elif extension == '.mp4':
+            _write_ffmpeg(output, indices, palette, scale, fps, (height, width))
+        else:
+            raise ValueError(f"対応していない形式です: {output}")
+    finally:
+        if isinstance(frames, TrajectoryReader):
+            frames.close()
+    return output
+
+def _export_job(job):
+    return export_run(**job)
+
+# 複数の実行結果をプロセスプールで同時に書き出す。jobs は export_run の引数の辞書の並び
+def export_runs(jobs, processes=None):
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(_export_job, jobs))
+
+if __name__ == '__main__':
+    import sys
+
+    # 使い方: python export.py <cells_state_step_{}.bin または .traj> <出力ファイル> [field]
+    directory = os.path.dirname(os.path.abspath(__file__))
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(directory, 'cells_state_step_{}.bin')
+    output = sys.argv[2] if len(sys.argv) > 2 else os.path.join(directory, 'cells_state.gif')
+    field = sys.argv[3] if len(sys.argv) > 3 else 'material'
+    print(f"File saved: {export_run(source, 150, 100, 100, output, field)}")
@@ -0,0 +1,340 @@
+import os
+import numpy as np
+
+from cells import (AIR, SOIL, NORMAL, BURNING, BURNED, STATE_COUNT, CELL_DTYPE,
+                   materialProperties, read_cells, write_cells)
+
+# 周囲8セル（system.cpp の dx, dy ループと同じ順番）
+NEIGHBOURS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
+
+# ifIgnite は x が外側、y が内側の順にセルをその場で書き換えるので、
+# 走査順で先に処理される近傍は更新後の状態、後の近傍は更新前の状態が見える
+PREDECESSORS = [(-1, -1), (-1, 0), (-1, 1), (0, -1)]
+SUCCESSORS = [(0, 1), (1, -1), (1, 0), (1, 1)]
+
+# 素材のプロパティを float32 の配列にまとめる
+def material_table(properties=materialProperties):
+    table = {
+        "t": np.array([p["t"] for p in properties], dtype=np.float32),
+        "I_0": np.array([p["I_0"] for p in properties], dtype=np.float32),
+        "I_1": np.array([p["I_1"] for p in properties], dtype=np.float32),
+        "E_out": np.array([p["E_out"] for p in properties], dtype=np.float32).reshape(-1, STATE_COUNT),
+    }
+    # 隣が燃えているときの方が発火しやすい（I_0 <= I_1）ことを前提にしている
+    if np.any(table["I_1"] < table["I_0"]):
+        raise ValueError("I_1 は I_0 以上である必要があります")
+    return table
+
+# 枠付き配列 padded の中で (dx, dy) だけずらした内側部分（x0 <= x < x1 の列）のビュー
+def shifted(padded, dx, dy, x0=0, x1=None):
+    if x1 is None:
+        x1 = padded.shape[0] - 2
+    height = padded.shape[1] - 2
+    return padded[1 + x0 + dx:1 + x1 + dx, 1 + dy:height + 1 + dy]
+
+# 森林火災シミュレーション（system.cpp と同じ計算を配列演算で行う）
+# frontier=True にすると、燃焼中・エネルギーを出しているセルとその周囲だけを毎ステップ処理する
+# （結果は全セルを処理する場合と同じ）
+class FireSimulation:
+    def __init__(self, cells, properties=materialProperties, frontier=False):
+        cells = np.asarray(cells, dtype=CELL_DTYPE)
+        self.width, self.height = cells.shape
+        self.table = material_table(properties)
+        self.frontier = frontier
+        self.step_count = 0
+
+        # 周囲に1セル分の枠（空気・通常状態・排出エネルギー0）を付けて保持する
+        shape = (self.width + 2, self.height + 2)
+        self._state = np.zeros(shape, dtype=np.int8)
+        self._material = np.zeros(shape, dtype=np.int8)
+        self._energy = np.zeros(shape, dtype=np.float32)
+        self._time = np.zeros(shape, dtype=np.float32)
+        self._emit = np.zeros(shape, dtype=np.float32)
+
+        # 各フィールドの内側部分（コピーではなくビュー）
+        self.state = self._state[1:-1, 1:-1]
+        self.material = self._material[1:-1, 1:-1]
+        self.energy = self._energy[1:-1, 1:-1]
+        self.time = self._time[1:-1, 1:-1]
+        self.emit = self._emit[1:-1, 1:-1]
+
+        self.state[...] = cells['state']
+        self.material[...] = cells['material']
+        self.energy[...] = cells['energy']
+        self.time[...] = cells['time']
+
+        # 素材はシミュレーション中に変わらないので、セルごとの定数を先に引いておく
+        # （枠の部分は空気の値になる。内側はビューで参照する）
+        material = self._material.astype(np.intp)
+        self._combustible = (material != AIR) & (material != SOIL)
+        self._lookup_material_constants(material)
+        self.combustible = self._combustible[1:-1, 1:-1]
+        self.burn_time = self._burn_time[1:-1, 1:-1]
+        self.ignite_energy = self._ignite_energy[1:-1, 1:-1]
+        self.self_ignite_energy = self._self_ignite_energy[1:-1, 1:-1]
+
+        # 枠付き配列を1次元で見たときの近傍へのずれ
+        stride = self.height + 2
+        self._neighbour_offsets = np.array([dx * stride + dy for dx, dy in NEIGHBOURS])
+        self._successor_offsets = np.array([dx * stride + dy for dx, dy in SUCCESSORS])
+        self._predecessor_offsets = np.array([dx * stride + dy for dx, dy in PREDECESSORS])
+        self._around_offsets = np.append(self._neighbour_offsets, 0)
+        self._inside = np.zeros(shape, dtype=bool)
+        self._inside[1:-1, 1:-1] = True
+        self._allocate_ignition_buffers()
+        self.refresh_emission()
+
+    @classmethod
+    def from_file(cls, filename, width, height, properties=materialProperties, frontier=False):
+        return cls(read_cells(filename, width, height), properties, frontier)
+
+    # 枠付きの素材配列 material からセルごとの素材定数を引く
+    def _lookup_material_constants(self, material):
+        self._burn_time = self.table["t"][material]
+        self._ignite_energy = self.table["I_0"][material]
+        self._self_ignite_energy = self.table["I_1"][material]
+        self._emit_index = material * STATE_COUNT
+        self._emit_table = self.table["E_out"].ravel()
+
+    # 各セルの排出エネルギー E_out[material][state] を引き直す
+    # （state や energy を外から書き換えたときは呼び出すこと。mask を渡すとその部分だけ更新）
+    # frontier モードでは処理対象のセルの集合も作り直す（mask の外のセルが処理対象から外れることもあるので全体で）
+    def refresh_emission(self, mask=None):
+        emit_index = self._emit_index[1:-1, 1:-1]
+        if mask is None:
+            self.emit[...] = self._emit_table[emit_index + self.state]
+        else:
+            self.emit[mask] = self._emit_table[emit_index[mask] + self.state[mask]]
+        if self.frontier:
+            self.rebuild_frontier()
+
+    # 処理が必要なセルの集合を現在の状態から作り直す
+    def rebuild_frontier(self):
+        normal = (self._state == NORMAL) & self._combustible
+        self._burning_cells = np.flatnonzero(self._state == BURNING)
+        self._emitting_cells = np.flatnonzero(self._emit)
+        # 次のステップで自然発火するセル（最初の1回だけ処理対象に加える）
+        self._hot_cells = np.flatnonzero(normal & (self._energy >= self._self_ignite_energy))
+        # 隣が燃えれば発火する候補セル（エネルギーは処理対象のセルでしか変わらないので差分で更新できる）
+        self._armed = normal & (self._energy >= self._ignite_energy) & ~(self._energy >= self._self_ignite_energy)
+
+    # 処理①: 周囲8セルの排出エネルギーを足し込む（updateTemperature）
+    def update_temperature(self):
+        self._update_temperature_columns(0, self.width)
+
+    # 処理②: 燃焼時間の更新と発火判定（ifIgnite）
+    def if_ignite(self):
+        self._prepare_ignition(0, self.width)
+        self._find_ignition(0, self.width)
+        self._chain_pending_ignition()
+        self._apply_ignition(0, self.width)
+
+    # 以下の _*_columns 系の処理は x0 <= x < x1 の列だけを扱い、別々の列の範囲なら同時に実行できる
+    def _update_temperature_columns(self, x0, x1):
+        energy_sum = np.zeros((x1 - x0, self.height), dtype=np.float32)
+        for dx, dy in NEIGHBOURS:
+            energy_sum += shifted(self._emit, dx, dy, x0, x1)
+        self.energy[x0:x1] += energy_sum
+
+    # 燃焼時間を進め、燃え尽きるセル・自然発火するセル・発火候補のセルを求める
+    def _prepare_ignition(self, x0, x1):
+        columns = slice(x0, x1)
+        state = self.state[columns]
+        time = self.time[columns]
+        combustible = self.combustible[columns]
+        burning = state == BURNING
+
+        # 燃焼中のセルは燃焼時間を進め、t に達したら燃焼後にする
+        burning_cells = burning & combustible
+        np.add(time, np.float32(1.0), out=time, where=burning_cells)
+        burned_out = burning_cells & (time >= self.burn_time[columns])
+
+        energy = self.energy[columns]
+        normal = (state == NORMAL) & combustible
+        self_ignite = normal & (energy >= self.self_ignite_energy[columns])
+        self._burned_out[columns] = burned_out
+        self._self_ignite[columns] = self_ignite
+        self._candidate[columns] = normal & (energy >= self.ignite_energy[columns]) & ~self_ignite
+
+        # 後から処理される近傍は更新前、先に処理される近傍は更新後の燃焼状態を見る
+        self._before[1 + x0:1 + x1, 1:-1] = burning
+        self._after[1 + x0:1 + x1, 1:-1] = (burning & ~burned_out) | self_ignite
+
+    # 近傍の燃焼状態から発火するセルを決める（隣の列の _prepare_ignition が済んでいること）
+    def _find_ignition(self, x0, x1):
+        has_burning_neighbour = np.zeros((x1 - x0, self.height), dtype=bool)
+        for dx, dy in SUCCESSORS:
+            has_burning_neighbour |= shifted(self._before, dx, dy, x0, x1)
+        for dx, dy in PREDECESSORS:
+            has_burning_neighbour |= shifted(self._after, dx, dy, x0, x1)
+
+        columns = slice(x0, x1)
+        candidate = self._candidate[columns]
+        self._ignite[columns] = self._self_ignite[columns] | (candidate & has_burning_neighbour)
+        self._pending[columns] = candidate & ~has_burning_neighbour
+
+    # 走査順に沿った連鎖発火（列をまたぐので全体で1回だけ行う）
+    def _chain_pending_ignition(self):
+        if self._pending.any():
+            self._ignite[...] = self._propagate_ignition(self._ignite, self._pending)
+
+    def _apply_ignition(self, x0, x1):
+        columns = slice(x0, x1)
+        state = self.state[columns]
+        burned_out = self._burned_out[columns]
+        ignite = self._ignite[columns]
+        state[burned_out] = BURNED
+        state[ignite] = BURNING
+        # 状態が変わったセルだけ排出エネルギーを更新する
+        changed = burned_out | ignite
+        self.emit[columns][changed] = self._emit_table[self._emit_index[1 + x0:1 + x1, 1:-1][changed] + state[changed]]
+
+    # 発火判定の途中結果を入れる配列（毎ステップ使い回す）
+    def _allocate_ignition_buffers(self):
+        shape = (self.width, self.height)
+        self._burned_out = np.zeros(shape, dtype=bool)
+        self._self_ignite = np.zeros(shape, dtype=bool)
+        self._candidate = np.zeros(shape, dtype=bool)
+        self._ignite = np.zeros(shape, dtype=bool)
+        self._pending = np.zeros(shape, dtype=bool)
+        self._before = np.zeros_like(self._state, dtype=bool)
+        self._after = np.zeros_like(self._state, dtype=bool)
+
+    # 同じステップ内で発火したセルが、走査順で後ろの候補セルを連鎖的に発火させる
+    def _propagate_ignition(self, ignite, pending):
+        ignited = np.zeros_like(self._state, dtype=bool)
+        waiting = np.zeros_like(self._state, dtype=bool)
+        ignited[1:-1, 1:-1] = ignite
+        waiting[1:-1, 1:-1] = pending
+        reached = self._chain_ignition(np.flatnonzero(ignited), waiting.ravel())
+        ignited.ravel()[reached] = True
+        return ignited[1:-1, 1:-1]
+
+    # 発火したセル ignited から、走査順で後ろの waiting なセルをたどる（たどったセルは waiting から外す）
+    def _chain_ignition(self, ignited, waiting):
+        chain = []
+        frontier = ignited
+        while frontier.size:
+            reached = (frontier[:, None] + self._successor_offsets).ravel()
+            reached = np.unique(reached[waiting[reached]])
+            waiting[reached] = False
+            chain.append(reached)
+            frontier = reached
+        return np.concatenate(chain) if chain else frontier
+
+    # 処理対象のセル: 燃焼中・エネルギーを出しているセルとその周囲8セル（1次元の番号、昇順 = 走査順）
+    def _active_cells(self):
+        sources = np.concatenate([self._burning_cells, self._emitting_cells, self._hot_cells])
+        self._hot_cells = self._hot_cells[:0]
+        active = np.unique((sources[:, None] + self._around_offsets).ravel())
+        return active[self._inside.ravel()[active]]
+
+    # 処理対象のセルだけで1世代分の処理を行う
+    def _step_frontier(self):
+        active = self._active_cells()
+        state = self._state.ravel()
+        energy = self._energy.ravel()
+        time = self._time.ravel()
+        emit = self._emit.ravel()
+
+        # 処理①: 排出エネルギーの和（周囲にエネルギーを出すセルがなければ 0 を足すだけ）
+        energy_sum = np.zeros(active.size, dtype=np.float32)
+        for offset in self._neighbour_offsets:
+            energy_sum += emit[active + offset]
+        energy[active] += energy_sum
+
+        # 処理②: 燃焼時間の更新と発火判定（全セル版の if_ignite と同じ判定）
+        cell_state = state[active]
+        combustible = self._combustible.ravel()[active]
+        burning = cell_state == BURNING
+        burning_cells = burning & combustible
+        time[active[burning_cells]] += np.float32(1.0)
+        burned_out = burning_cells & (time[active] >= self._burn_time.ravel()[active])
+
+        cell_energy = energy[active]
+        normal = (cell_state == NORMAL) & combustible
+        self_ignite = normal & (cell_energy >= self._self_ignite_energy.ravel()[active])
+        candidate = normal & (cell_energy >= self._ignite_energy.ravel()[active]) & ~self_ignite
+
+        before = self._before.ravel()
+        after = self._after.ravel()
+        before_cells = active[burning]
+        after_cells = active[(burning & ~burned_out) | self_ignite]
+        before[before_cells] = True
+        after[after_cells] = True
+        has_burning_neighbour = np.zeros(active.size, dtype=bool)
+        for offset in self._successor_offsets:
+            has_burning_neighbour |= before[active + offset]
+        for offset in self._predecessor_offsets:
+            has_burning_neighbour |= after[active + offset]
+        before[before_cells] = False
+        after[after_cells] = False
+
+        # 処理対象外のセルには燃焼中・自然発火する近傍がないので、候補のままでよい
+        armed = self._armed.ravel()
+        armed[active] = candidate & ~has_burning_neighbour
+        ignited = active[self_ignite | (candidate & has_burning_neighbour)]
+        ignited = np.concatenate([ignited, self._chain_ignition(ignited, armed)])
+        burned = active[burned_out]
+
+        state[burned] = BURNED
+        state[ignited] = BURNING
+        changed = np.concatenate([burned, ignited])
+        emit[changed] = self._emit_table[self._emit_index.ravel()[changed] + state[changed]]
+
+        self._burning_cells = np.union1d(np.setdiff1d(self._burning_cells, burned, assume_unique=True), ignited)
+        self._emitting_cells = np.union1d(np.setdiff1d(self._emitting_cells, changed), changed[emit[changed] != 0])
+
+    # 1世代分の処理
+    def step(self):
+        if self.frontier:
+            self._step_frontier()
+        else:
+            self.update_temperature()
+            self.if_ignite()
+        self.step_count += 1
+
+    # steps 世代分進める（各ステップ後のシミュレーションを順に返す）
+    def run(self, steps):
+        for _ in range(steps):
+            self.step()
+            yield self
+
+    # 現在の状態を <4f の構造化配列として取り出す
+    def to_cells(self):
+        cells = np.empty((self.width, self.height), dtype=CELL_DTYPE)
+        cells['state'] = self.state
+        cells['material'] = self.material
+        cells['energy'] = self.energy
+        cells['time'] = self.time
+        return cells
+
+    def save(self, filename):
+        write_cells(filename, self.to_cells())
+
+# C++ 版が書き出したステップファイルと比較し、最初に一致しなかったステップを返す（全て一致なら None）
+def compare_with_reference(simulation, filename_format, steps):
+    for step in range(steps):
+        simulation.step()
+        reference = read_cells(filename_format.format(simulation.step_count),
+                               simulation.width, simulation.height)
+        if reference.tobytes() != simulation.to_cells().tobytes():
+            return simulation.step_count
+    return None
+
+if __name__ == '__main__':
+    from trajectory import TrajectoryWriter
+
+    # system.cpp の main と同じ処理（ステップごとのファイルの代わりに1つの軌跡ファイルに保存）
+    directory = os.path.dirname(os.path.abspath(__file__))
+    width = 150
+    height = 100
+    steps = 100
+
+    simulation = FireSimulation.from_file(os.path.join(directory, 'cells_state.bin'), width, height)
+    filename = os.path.join(directory, 'cells_state.traj')
+    with TrajectoryWriter(filename, width, height) as writer:
+        for _ in simulation.run(steps):
+            writer.write(simulation.to_cells())
+            print(f"Step {simulation.step_count} completed.")
+    print(f"File saved: {filename}")
@@ -0,0 +1,143 @@
+import numpy as np
+
+from cells import AIR, WOOD
+from scene import slope_heights, fill_trees
+
+# 近傍の候補点が衝突しないように、格子のマスを 3x3 ごとの組に分けて順番に処理する
+PHASES = [(px, py) for px in range(3) for py in range(3)]
+# 半径 radius 以内の点が入りうる近傍 5x5 マスへのずれ
+NEAR_X, NEAR_Y = [offset.ravel() for offset in np.meshgrid(np.arange(-2, 3), np.arange(-2, 3), indexing='ij')]
+
+# 密度 density（スカラー・(width, height) の配列・f(x, y) を返す関数）を点 (x, y) で評価する
+def _density_at(density, x, y):
+    if callable(density):
+        return density(x, y)
+    density = np.asarray(density, dtype=float)
+    if density.ndim == 0:
+        return np.full(x.shape, float(density))
+    return density[x.astype(int), y.astype(int)]
+
+# poisson_disk が空間インデックスに使うマスの数
+def disk_grid_shape(width, height, radius):
+    cell = radius / np.sqrt(2)
+    return int(np.ceil(width / cell)), int(np.ceil(height / cell))
+
+# ポアソンディスクサンプリング: 互いに radius 以上離れた点を [0, width) x [0, height) にばらまく
+# 一辺 radius / √2 のマス（1マスに点は高々1つ）を空間インデックスにして、近傍 5x5 マスだけを調べる
+# 3マス以上離れたマスの候補同士は衝突しないので、同じ組のマスの候補はまとめて判定する
+# density (0〜1) は候補を残す確率で、場所ごとの木の密度を変えるのに使う。seed が同じなら結果も同じ
+# active を渡すと、そのマス（(grid_width, grid_height) のブール配列）にだけ候補を作る
+def poisson_disk(width, height, radius, seed=None, density=1.0, attempts=30, active=None):
+    rng = np.random.default_rng(seed)
+    cell = radius / np.sqrt(2)
+    grid_width, grid_height = disk_grid_shape(width, height, radius)
+    if active is None:
+        active = np.ones((grid_width, grid_height), dtype=bool)
+
+    # 周囲に2マスの空きを付けたマスごとの点の座標（点がなければ nan）、近傍は1次元の番号で引く
+    points_x = np.full((grid_width + 4, grid_height + 4), np.nan)
+    points_y = np.full((grid_width + 4, grid_height + 4), np.nan)
+    near = NEAR_X * (grid_height + 4) + NEAR_Y
+    # 組ごとの、まだ点のないマスの一覧（点が入ったマスは次の試行から外す）
+    phases = []
+    for px, py in PHASES:
+        gx, gy = np.meshgrid(np.arange(px, grid_width, 3), np.arange(py, grid_height, 3), indexing='ij')
+        inside = active[gx, gy]
+        phases.append((gx[inside], gy[inside]))
+
+    for _ in range(attempts):
+        for phase, (gx, gy) in enumerate(phases):
+            empty = np.isnan(points_x[gx + 2, gy + 2])
+            gx, gy = gx[empty], gy[empty]
+            phases[phase] = (gx, gy)
+
+            x = (gx + rng.random(gx.size)) * cell
+            y = (gy + rng.random(gy.size)) * cell
+            keep = (x < width) & (y < height)
+            gx, gy, x, y = gx[keep], gy[keep], x[keep], y[keep]
+            keep = rng.random(gx.size) < _density_at(density, x, y)
+            gx, gy, x, y = gx[keep], gy[keep], x[keep], y[keep]
+
+            # 近傍 5x5 マスの点との距離をまとめて調べる（点のないマスは nan なので衝突しない）
+            index = ((gx + 2) * (grid_height + 4) + gy + 2)[:, None] + near
+            distance = (points_x.take(index) - x[:, None]) ** 2 + (points_y.take(index) - y[:, None]) ** 2
+            keep = ~np.any(distance < radius ** 2, axis=1)
+            gx, gy, x, y = gx[keep], gy[keep], x[keep], y[keep]
+            points_x[gx + 2, gy + 2] = x
+            points_y[gx + 2, gy + 2] = y
+
+    points = np.stack([points_x[2:-2, 2:-2].ravel(), points_y[2:-2, 2:-2].ravel()], axis=1)
+    return points[~np.isnan(points[:, 0])]
+
+# 斜面の上に森を作る: 地表から depth セルの帯の中に木の根元をばらまき、形をランダムに変えて描く
+# density は木を置く確率（スカラー・(width, height) の配列・関数）で、地域ごとの密度に使える
+# 格子の外にはみ出した部分は切り捨てる。作った木の一覧 (base, height, thickness, trunk_height, sharpness, ratio) を返す
+def gen_forest(grid, deg, radius, seed=None, depth=1, density=1.0, height_range=(20, 60),
+               sharpness_range=(np.pi / 16, np.pi / 8), ratio_range=(1.1, 1.4), origin=(0, 0)):
+    rng = np.random.default_rng(seed)
+    heights = slope_heights(grid.width, deg, origin)
+
+    # 地表の帯の外は密度 0 にする
+    def band_density(x, y):
+        ground = heights[x.astype(int)]
+        inside = (y >= ground) & (y < ground + depth)
+        return np.where(inside, _density_at(density, x, y), 0.0)
+
+    # 帯の中だけを調べればよいように、帯を含む高さの範囲に絞ってサンプリングする
+    bottom = max(int(heights.min()), 0)
+    top = min(int(heights.max()) + depth, grid.height)
+    if bottom >= top:
+        return []
+    # 帯と重なるマスだけに候補を作る（マスの x の範囲での地表の最低・最高の高さから求める）
+    grid_width, grid_height = disk_grid_shape(grid.width, top - bottom, radius)
+    cell = radius / np.sqrt(2)
+    x_start = (np.arange(grid_width) * cell).astype(int)
+    low = np.minimum.reduceat(heights, x_start) - bottom
+    high = np.maximum.reduceat(heights, x_start) - bottom + depth
+    y_cell = np.arange(grid_height) * cell
+    active = (y_cell[None, :] + cell > low[:, None]) & (y_cell[None, :] < high[:, None])
+    points = poisson_disk(grid.width, top - bottom, radius, rng, lambda x, y: band_density(x, y + bottom),
+                          active=active)
+    points[:, 1] += bottom
+
+    # 上にある木から先に描き、手前（下）の木が上書きする
+    points = points[np.argsort(-points[:, 1], kind='stable')]
+    count = len(points)
+    tree_height = rng.integers(height_range[0], height_range[1] + 1, count)
+    thickness = np.maximum(tree_height // 25, 1)
+    trunk_height = tree_height // 5
+    sharpness = rng.uniform(*sharpness_range, count)
+    ratio = rng.uniform(*ratio_range, count)
+
+    trees = [((int(x), int(y)), int(h), int(t), int(th), float(s), float(r))
+             for (x, y), h, t, th, s, r in zip(points, tree_height, thickness, trunk_height, sharpness, ratio)]
+    fill_trees(grid, trees)
+    return trees
+
+# 幹が地表につながっていない木の一覧
+# 根元のセルが木（WOOD）で、根元の列の地表から幹の上端 (y_base + trunk_height) までに空気のセルがなければつながっているとみなす
+# （手前の木の葉や枝が重なっていてもよい）
+def floating_trees(grid, trees, deg, origin=(0, 0)):
+    heights = slope_heights(grid.width, deg, origin)
+    floating = []
+    for tree in trees:
+        (x, y), trunk_height = tree[0], tree[3]
+        if not (0 <= x < grid.width and 0 <= y < grid.height):
+            continue
+        column = grid.material[x, max(int(heights[x]), 0):min(y + trunk_height + 1, grid.height)]
+        if grid.material[x, y] != WOOD or np.any(column == AIR):
+            floating.append(tree)
+    return floating
+
+if __name__ == '__main__':
+    from cells import CellGrid
+    from scene import fill_slope
+
+    # 斜面の上に森を作り、すべての木の幹が地表につながっていることを確かめる
+    grid = CellGrid(600, 300)
+    fill_slope(grid, 20)
+    trees = gen_forest(grid, 20, radius=12, seed=0)
+    floating = floating_trees(grid, trees, 20)
+    print(f"木 {len(trees)} 本、幹が地表につながっていない木 {len(floating)} 本")
+    if floating:
+        raise SystemExit(f"幹が地表につながっていない木があります: {floating[:5]}")
@@ -0,0 +1,169 @@
+import csv
+import json
+import time
+import numpy as np
+
+from cells import BURNING, BURNED, write_cells
+from fire import NEIGHBOURS, shifted
+
+# シミュレーションの実行を計測する（使うときだけ Instrument でくるむ）
+# 処理ごとの経過時間と、ステップごとのセル数などのカウンターを表（行の辞書のリスト）にためて、CSV / JSON に書き出す
+#
+#   instrument = Instrument(sample_every=10)
+#   for sim in instrument.run(simulation, 1000, save=saver, render=draw):
+#       ...
+#   instrument.to_csv('profile.csv')
+
+# 計測する処理（frontier モードは処理①②を1つの関数で行うので frontier_step にまとめて計る）
+PHASES = ['update_temperature', 'if_ignite', 'frontier_step', 'serialize', 'render']
+COUNTERS = ['ignited', 'burned_out', 'burning', 'burned', 'front', 'bytes_written']
+
+# 燃焼中・エネルギーを出しているセルとその周囲8セルの数（frontier モードで処理対象になるセルの数）
+def front_size(sim):
+    source = (sim._state == BURNING) | (sim._emit != 0)
+    front = source[1:-1, 1:-1].copy()
+    for dx, dy in NEIGHBOURS:
+        front |= shifted(source, dx, dy)
+    return int(np.count_nonzero(front))
+
+class Instrument:
+    # sample_every ステップに1回だけカウンターを数えて表に行を加える（時間は毎ステップ合計に足す）
+    def __init__(self, sample_every=1):
+        self.sample_every = sample_every
+        self.rows = []
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.steps = 0
+        self.bytes_written = 0
+        self._phase_times = dict.fromkeys(PHASES, 0.0)
+        self._bytes = 0
+
+    # name の処理として func を実行し、経過時間を足し込む
+    def timed(self, name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        self._phase_times[name] += elapsed
+        self.totals[name] += elapsed
+        return result
+
+    # sim の処理①②（frontier モードなら _step_frontier）をこのインスタンスの属性で置き換えて計測する
+    # サブクラスの step（アンサンブルの集計など）はそのまま呼ばれる
+    def _attach(self, sim):
+        for name in ['update_temperature', 'if_ignite']:
+            setattr(sim, name, lambda method=getattr(sim, name), name=name: self.timed(name, method))
+        sim._step_frontier = lambda method=sim._step_frontier: self.timed('frontier_step', method)
+
+    def _detach(self, sim):
+        for name in ['update_temperature', 'if_ignite', '_step_frontier']:
+            del sim.__dict__[name]
+
+    # sim を steps ステップ進め、各ステップ後の sim を返す
+    # save(sim) は書き出したバイト数を返す関数、render(sim) は描画する関数（どちらも省略可）
+    def run(self, sim, steps, save=None, render=None):
+        self._attach(sim)
+        try:
+            for _ in range(steps):
+                sampled = (sim.step_count + 1) % self.sample_every == 0
+                before = sim.state == BURNING if sampled else None
+                sim.step()
+                if save is not None:
+                    written = self.timed('serialize', save, sim)
+                    self._bytes += written or 0
+                    self.bytes_written += written or 0
+                if render is not None:
+                    self.timed('render', render, sim)
+                self.steps += 1
+                if sampled:
+                    self._record(sim, before)
+                yield sim
+        finally:
+            self._detach(sim)
+
+    # 表に1行加える（時間と書き出したバイト数は前の行からの合計）
+    def _record(self, sim, before):
+        state = sim.state
+        burning = state == BURNING
+        row = {"step": sim.step_count}
+        row.update({f"{name}_seconds": seconds for name, seconds in self._phase_times.items()})
+        row.update({
+            "ignited": int(np.count_nonzero(burning & ~before)),
+            "burned_out": int(np.count_nonzero(before & (state == BURNED))),
+            "burning": int(np.count_nonzero(burning)),
+            "burned": int(np.count_nonzero(state == BURNED)),
+            "front": front_size(sim),
+            "bytes_written": self._bytes,
+        })
+        self.rows.append(row)
+        self._phase_times = dict.fromkeys(PHASES, 0.0)
+        self._bytes = 0
+
+    # 火が燃え続けているのに燃焼中・燃焼後のセル数が patience ステップ以上変わらなくなった最初のステップ（なければ None）
+    def stalled(self, patience=50):
+        start = None
+        for previous, row in zip(self.rows, self.rows[1:]):
+            unchanged = (row["burning"] > 0 and row["burning"] == previous["burning"]
+                         and row["burned"] == previous["burned"])
+            if not unchanged:
+                start = None
+                continue
+            start = previous["step"] if start is None else start
+            if row["step"] - start >= patience:
+                return start
+        return None
+
+    # 処理ごとの合計時間と全体に占める割合
+    def summary(self):
+        total = sum(self.totals.values())
+        return {
+            "steps": self.steps,
+            "bytes_written": self.bytes_written,
+            "phases": {name: {"seconds": seconds, "share": seconds / total if total else 0.0}
+                       for name, seconds in self.totals.items() if seconds},
+        }
+
+    def to_csv(self, filename):
+        with open(filename, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(self.rows[0]) if self.rows else ['step'])
+            writer.writeheader()
+            writer.writerows(self.rows)
+
+    def to_json(self, filename):
+        with open(filename, 'w') as file:
+            json.dump({"sample_every": self.sample_every, "summary": self.summary(), "rows": self.rows}, file, indent=2)
+
+# ステップごとのファイルに保存し、書き出したバイト数を返す関数を作る（system.cpp と同じ cells_state_step_N.bin）
+def step_file_saver(filename_format):
+    def save(sim):
+        cells = sim.to_cells()  # 格子の詰め直しは1回だけにする（sim.save はもう一度 to_cells を呼ぶ）
+        write_cells(filename_format.format(sim.step_count), cells)
+        return cells.nbytes
+    return save
+
+if __name__ == '__main__':
+    import os
+    import sys
+    from fire import FireSimulation
+
+    # fire.py と同じ計算を計測付きで実行する: python instrument.py [出力.csv|.json] [sample_every] [--frontier]
+    directory = os.path.dirname(os.path.abspath(__file__))
+    args = [arg for arg in sys.argv[1:] if arg != '--frontier']
+    output = args[0] if args else os.path.join(directory, 'profile.csv')
+    sample_every = int(args[1]) if len(args) > 1 else 1
+
+    simulation = FireSimulation.from_file(os.path.join(directory, 'cells_state.bin'), 150, 100,
+                                          frontier='--frontier' in sys.argv)
+    instrument = Instrument(sample_every)
+    save = step_file_saver(os.path.join(directory, 'cells_state_step_{}.bin'))
+    for sim in instrument.run(simulation, 100, save=save):
+        pass
+
+    for name, phase in instrument.summary()["phases"].items():
+        print(f"{name:20s} {phase['seconds'] * 1e3:10.3f} ms {phase['share'] * 100:6.1f} %")
+    stall = instrument.stalled()
+    if stall is not None:
+        print(f"ステップ {stall} 以降、火が燃え続けたまま広がっていません")
+    if output.endswith('.json'):
+        instrument.to_json(output)
+    else:
+        instrument.to_csv(output)
+    print(f"File saved: {output}")
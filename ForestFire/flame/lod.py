@@ -0,0 +1,192 @@
+import collections
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation
+
+from cells import MATERIAL_COUNT
+from animate import field_colormap, open_frames
+
+# 大きな格子のための詳細度（LOD）付きビューア
+# 格子を TILE x TILE セルのタイルに分け、レベル l のタイルは 2^l x 2^l セルを1つにまとめたもの（ミップマップ）。
+# 表示範囲と画面の画素数から「1画素あたり1〜2セル」になるレベルを選び、見えている範囲のタイルだけを作る。
+# レベル 0 のタイルはステップのデータから切り出し、レベル l のタイルはレベル l - 1 の 2x2 枚のタイルを半分に縮小する。
+# 縮小は素材なら最頻値、状態とエネルギーなら最大値（燃えているセルが縮小で消えないように）。素材のレベル 2 以上は
+# 最頻値の最頻値なので、元のセルから直接数えた最頻値とは違うことがある。
+# 作ったタイルは LRU キャッシュに残し、パンやズームで使い回す。軌跡ファイルは1ステップ読むたびに全体を
+# 展開するので、読んだステップのフィールドも FRAME_CACHE_SIZE ステップ分だけ残しておく
+
+TILE = 256
+TILE_CACHE_SIZE = 512
+FRAME_CACHE_SIZE = 2
+MODE_CHUNK = 1 << 22
+
+# フィールドごとの縮小方法
+REDUCTIONS = {'material': 'mode', 'state': 'max', 'energy': 'max'}
+
+# factor x factor セルごとの最大値（端の割り切れない部分はあるセルだけで求める）
+def block_max(values, factor):
+    if factor == 1:
+        return np.asarray(values)
+    rows = np.maximum.reduceat(values, np.arange(0, values.shape[0], factor), axis=0)
+    return np.maximum.reduceat(rows, np.arange(0, values.shape[1], factor), axis=1)
+
+# factor x factor セルごとの最頻値（値は 0 <= v < count の整数、同数なら小さい値）
+# 「ブロック番号 * count + 値」を bincount で数える。一度に数えるのは MODE_CHUNK セルずつ
+def block_mode(values, factor, count=MATERIAL_COUNT):
+    if factor == 1:
+        return np.asarray(values)
+    width, height = values.shape
+    columns, rows = -(-width // factor), -(-height // factor)
+    y_block = np.arange(height) // factor
+    chunk = max(1, MODE_CHUNK // (factor * height))  # 1回に処理するブロックの列数
+    result = np.empty((columns, rows), dtype=np.float32)
+    for c0 in range(0, columns, chunk):
+        part = np.asarray(values[c0 * factor:(c0 + chunk) * factor]).astype(np.intp)
+        n = -(-part.shape[0] // factor)
+        ids = ((np.arange(part.shape[0]) // factor)[:, None] * rows + y_block) * count + part
+        counts = np.bincount(ids.ravel(), minlength=n * rows * count).reshape(n, rows, count)
+        result[c0:c0 + n] = counts.argmax(axis=2)
+    return result
+
+def reduce_block(values, factor, field):
+    if REDUCTIONS[field] == 'mode':
+        return block_mode(values, factor)
+    return block_max(values, factor)
+
+# 1つのフィールドの全ステップ分のミップマップ（タイルは要求されたときに作る）
+class TilePyramid:
+    def __init__(self, frames, field, width, height, cache_size=TILE_CACHE_SIZE):
+        if field not in REDUCTIONS:
+            raise ValueError(f"縮小できないフィールドです: {field}")
+        self.frames = frames
+        self.field = field
+        self.width = width
+        self.height = height
+        # 最上位のレベルは格子全体が1枚のタイルに収まるレベル
+        self.levels = max(0, int(np.ceil(np.log2(max(width, height) / TILE)))) + 1
+        self.cache_size = cache_size
+        self._tiles = collections.OrderedDict()
+        self._fields = collections.OrderedDict()
+
+    # レベル level の大きさ（セル数）
+    def level_shape(self, level):
+        factor = 2 ** level
+        return -(-self.width // factor), -(-self.height // factor)
+
+    # ステップ step のフィールド全体（メモリマップならビューのままで、読むのは切り出した部分だけ）
+    def field_values(self, step):
+        if step in self._fields:
+            self._fields.move_to_end(step)
+            return self._fields[step]
+        values = self.frames[step][self.field]
+        self._fields[step] = values
+        if len(self._fields) > FRAME_CACHE_SIZE:
+            self._fields.popitem(last=False)
+        return values
+
+    # ステップ step（0 から数えた位置）のレベル level のタイル (tx, ty)
+    def tile(self, step, level, tx, ty):
+        key = (step, level, tx, ty)
+        if key in self._tiles:
+            self._tiles.move_to_end(key)
+            return self._tiles[key]
+        if level == 0:
+            x0, y0 = tx * TILE, ty * TILE
+            tile = np.asarray(self.field_values(step)[x0:x0 + TILE, y0:y0 + TILE])
+        else:
+            # 1つ下のレベルの、このタイルに入る 2x2 枚（格子の端では 1 枚や 2 枚）を並べて半分に縮小する
+            columns, rows = self.level_shape(level - 1)
+            children = [[self.tile(step, level - 1, cx, cy) for cy in range(2 * ty, min(2 * ty + 2, -(-rows // TILE)))]
+                        for cx in range(2 * tx, min(2 * tx + 2, -(-columns // TILE)))]
+            tile = reduce_block(np.block(children), 2, self.field)
+        self._tiles[key] = tile
+        if len(self._tiles) > self.cache_size:
+            self._tiles.popitem(last=False)
+        return tile
+
+    # レベル level の [x0, x1) x [y0, y1)（レベルのセル単位）を含むタイルを並べた配列と、その範囲
+    def window(self, step, level, x0, x1, y0, y1):
+        columns, rows = self.level_shape(level)
+        tx0, ty0 = max(0, x0 // TILE), max(0, y0 // TILE)
+        tx1, ty1 = min(-(-columns // TILE), -(-x1 // TILE)), min(-(-rows // TILE), -(-y1 // TILE))
+        mosaic = np.block([[self.tile(step, level, tx, ty) for ty in range(ty0, ty1)] for tx in range(tx0, tx1)])
+        return mosaic, (tx0 * TILE, tx0 * TILE + mosaic.shape[0], ty0 * TILE, ty0 * TILE + mosaic.shape[1])
+
+    # 表示範囲の幅 cells_per_pixel（1画素あたりのセル数）に合うレベル
+    def level_for(self, cells_per_pixel):
+        level = int(np.floor(np.log2(max(cells_per_pixel, 1.0))))
+        return min(level, self.levels - 1)
+
+# 表示範囲が変わるたびに、合うレベルの見えているタイルだけを描き直すビューア
+# ← → キーでステップを移動する
+class LodViewer:
+    def __init__(self, frames, width, height, steps, field='material', vmax=None):
+        self.pyramid = TilePyramid(frames, field, width, height)
+        self.width = width
+        self.height = height
+        self.steps = steps
+        self.step = 0
+        if field == 'energy' and vmax is None:
+            # 最上位のレベルの最大値は全セルの最大値
+            top = self.pyramid.levels - 1
+            vmax = max(float(self.pyramid.window(steps - 1, top, 0, 1, 0, 1)[0].max()), 1.0)
+        field_cmap, norm = field_colormap(field, vmax)
+
+        self.fig, self.ax = plt.subplots(figsize=(8, 6))
+        self.image = self.ax.imshow(np.zeros((1, 1)), cmap=field_cmap, norm=norm, origin='lower',
+                                    interpolation='nearest', extent=(0, width, 0, height))
+        self.label = self.ax.text(0.02, 0.95, '', transform=self.ax.transAxes, color='white',
+                                  bbox={'facecolor': 'black', 'alpha': 0.5})
+        self.ax.set_xlim(0, width)
+        self.ax.set_ylim(0, height)
+        self.ax.set_xticks([])  # x軸の目盛りを非表示
+        self.ax.set_yticks([])  # y軸の目盛りを非表示
+        self.level = None
+        self.ax.callbacks.connect('xlim_changed', lambda ax: self.refresh())
+        self.ax.callbacks.connect('ylim_changed', lambda ax: self.refresh())
+        self.fig.canvas.mpl_connect('resize_event', lambda event: self.refresh())
+        self.fig.canvas.mpl_connect('key_press_event', self._on_key)
+        self.refresh()
+
+    # 現在の表示範囲とステップに合わせて画像を差し替える
+    def refresh(self):
+        (x0, x1), (y0, y1) = sorted(self.ax.get_xlim()), sorted(self.ax.get_ylim())
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.width), min(y1, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        # アスペクト比をそろえる前の軸の大きさ [画素]（表示範囲はこの中に縦横比を保って収まる）
+        box = self.ax.get_position(original=True).transformed(self.fig.transFigure)
+        pixels_x, pixels_y = max(box.width, 1), max(box.height, 1)
+        self.level = self.pyramid.level_for(max((x1 - x0) / pixels_x, (y1 - y0) / pixels_y))
+        factor = 2 ** self.level
+        mosaic, (mx0, mx1, my0, my1) = self.pyramid.window(
+            self.step, self.level, int(x0 // factor), int(-(-x1 // factor)), int(y0 // factor), int(-(-y1 // factor)))
+        self.image.set_data(mosaic.T)  # 転置して表示
+        self.image.set_extent((mx0 * factor, min(mx1 * factor, self.width), my0 * factor, min(my1 * factor, self.height)))
+        self.label.set_text(f'Step {self.step + 1} (1/{factor})')
+        self.fig.canvas.draw_idle()
+
+    def show_step(self, step):
+        self.step = step % self.steps
+        self.refresh()
+        return self.image, self.label
+
+    def _on_key(self, event):
+        if event.key in ('right', 'left'):
+            self.show_step(self.step + (1 if event.key == 'right' else -1))
+
+    # ステップを順に表示するアニメーション（再生中もズームやパンができる）
+    def play(self, interval=100):
+        return FuncAnimation(self.fig, self.show_step, frames=self.steps, interval=interval, repeat=False)
+
+# ステップファイル（または軌跡ファイル）を LOD ビューアで再生する
+def view_cells(filename_format, width, height, steps, field='material', interval=100):
+    viewer = LodViewer(open_frames(filename_format, width, height, steps), width, height, steps, field)
+    animation = viewer.play(interval)
+    plt.show()
+    return viewer, animation
+
+if __name__ == '__main__':
+    # animate.py と同じステップファイルを表示する
+    view_cells('flame/cells_state_step_{}.bin', 150, 100, 100)
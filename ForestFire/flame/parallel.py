@@ -0,0 +1,48 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from cells import materialProperties, read_cells
+from fire import FireSimulation
+
+# 格子を x 方向の帯（タイル）に分け、各処理をタイルごとにスレッドプールで同時に実行する
+# NumPy の配列演算は実行中に GIL を解放するので、大きな格子ではコア数に応じて速くなる
+# タイル境界の1列（ハロー）は共有している枠付き配列をそのまま読むので、
+# 処理の区切りごとに全タイルの完了を待てば、ハローの受け渡しは不要になる
+class TiledFireSimulation(FireSimulation):
+    def __init__(self, cells, properties=materialProperties, frontier=False, workers=None, tiles=None):
+        if frontier:
+            raise ValueError("TiledFireSimulation は frontier モードに対応していません")
+        super().__init__(cells, properties)
+        self.workers = workers or os.cpu_count()
+        tiles = min(tiles or self.workers, self.width)
+        bounds = np.linspace(0, self.width, tiles + 1).astype(int)
+        self.tiles = list(zip(bounds[:-1], bounds[1:]))
+        self._pool = ThreadPoolExecutor(self.workers)
+
+    @classmethod
+    def from_file(cls, filename, width, height, properties=materialProperties, workers=None, tiles=None):
+        return cls(read_cells(filename, width, height), properties, workers=workers, tiles=tiles)
+
+    # 全タイルに method(x0, x1) を実行し、すべて終わるまで待つ
+    def _each_tile(self, method):
+        for _ in self._pool.map(lambda tile: method(*tile), self.tiles):
+            pass
+
+    def update_temperature(self):
+        self._each_tile(self._update_temperature_columns)
+
+    def if_ignite(self):
+        self._each_tile(self._prepare_ignition)
+        self._each_tile(self._find_ignition)
+        self._chain_pending_ignition()
+        self._each_tile(self._apply_ignition)
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
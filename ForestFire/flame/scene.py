@@ -0,0 +1,130 @@
+import numpy as np
+
+from cells import SOIL, WOOD, LEAF, DRY_LEAF, NORMAL, CELL_DTYPE
+
+# 地形や木をセルの格子 (CellGrid) に書き込む関数
+# どれも1セルずつではなく、マスクやインデックス配列でまとめて書き込む
+
+# deg 度の斜面の各列 x の高さ（base.py の gen_slope と同じく int(tan * x) で切り捨て）
+def slope_heights(width, deg, origin=(0, 0)):
+    x0, y0 = origin
+    a = np.tan(np.pi * deg / 180)
+    return (a * (np.arange(width) - x0)).astype(int) + y0
+
+# 斜面より下の半平面を material で埋める
+def fill_slope(grid, deg, material=SOIL, origin=(0, 0)):
+    heights = slope_heights(grid.width, deg, origin)
+    y = np.arange(grid.height)
+    grid.fill(y[None, :] < heights[:, None], material)
+
+# 斜面の上に厚さ thickness の層（落ち葉など）を敷く
+def fill_band(grid, deg, thickness, material=DRY_LEAF, origin=(0, 0)):
+    heights = slope_heights(grid.width, deg, origin)[:, None]
+    y = np.arange(grid.height)[None, :]
+    grid.fill((y >= heights) & (y < heights + thickness), material)
+
+# 多角形 vertices [(x, y), ...] の内側のセル（セルの座標 (x, y) が内側にあるもの）を埋める
+def fill_polygon(grid, vertices, material, state=NORMAL, energy=0.0, time=0.0):
+    vertices = np.asarray(vertices, dtype=float)
+    x_lo, y_lo = np.maximum(np.floor(vertices.min(axis=0)).astype(int), 0)
+    x_hi, y_hi = np.minimum(np.ceil(vertices.max(axis=0)).astype(int) + 1, (grid.width, grid.height))
+    if x_lo >= x_hi or y_lo >= y_hi:
+        return
+    x, y = np.ogrid[x_lo:x_hi, y_lo:y_hi]
+
+    # 偶奇規則: 点から +x 方向に伸ばした半直線と交わる辺の数が奇数なら内側
+    inside = np.zeros((x_hi - x_lo, y_hi - y_lo), dtype=bool)
+    start = vertices
+    end = np.roll(vertices, -1, axis=0)
+    for (xa, ya), (xb, yb) in zip(start, end):
+        if ya == yb:
+            continue
+        crosses = (ya > y) != (yb > y)
+        x_cross = xa + (y - ya) * (xb - xa) / (yb - ya)
+        inside ^= crosses & (x < x_cross)
+    grid.cells[x_lo:x_hi, y_lo:y_hi][inside] = (state, material, energy, time)
+
+# 横一列の区間（スパン）の集まりをまとめて書き込む
+# spans は同じ長さの配列 y, x0, x1（両端を含む）, material, time の辞書で、重なる部分は後のスパンが勝つ
+# 格子の外にはみ出した部分は切り捨てる
+def fill_spans(grid, spans):
+    y = spans["y"]
+    x0 = np.maximum(spans["x0"], 0)
+    x1 = np.minimum(spans["x1"], grid.width - 1)
+    keep = (y >= 0) & (y < grid.height) & (x0 <= x1)
+    order = np.flatnonzero(keep)
+    if not order.size:
+        return
+    lengths = x1[order] - x0[order] + 1
+
+    # 各スパンの x を1本の配列に展開する（np.repeat と累積和によるオフセット）
+    span = np.repeat(order, lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    index = (x0[span] + offsets) * grid.height + y[span]
+
+    # 同じセルに複数のスパンが重なるときは番号が最大（最後）のスパンの値を使う
+    owner = np.full(grid.width * grid.height, -1, dtype=np.int64)
+    np.maximum.at(owner, index, span)
+    index = np.flatnonzero(owner >= 0)
+    span = owner[index]
+    cells = grid.cells.reshape(-1)
+    values = np.zeros(index.size, dtype=CELL_DTYPE)
+    values['state'] = NORMAL
+    values['material'] = spans["material"][span]
+    values['time'] = spans["time"][span]
+    cells[index] = values
+
+# 針葉樹のスパンを作る（base.py の gen_tree と同じ形: 葉 → 幹 → 枝の順に上書き）
+# trees は (base, height, thickness, trunk_height[, sharpness[, ratio]]) の並び
+# 幹の太さは根元からの高さで決める。absolute_trunk=True なら元の gen_tree と同じく格子の y 座標で計算する
+# （根元が y = height より上の木は幹がなくなるので、保存済みのシーンを作り直すとき以外は使わない）
+def tree_spans(trees, sharpness=np.pi / 12, ratio=1.2, absolute_trunk=False):
+    params = [tuple(tree) + (sharpness, ratio)[len(tree) - 4:] for tree in trees]
+    if not params:
+        return {key: np.zeros(0, dtype=int) for key in ("y", "x0", "x1", "material", "time")}
+    x_base = np.array([p[0][0] for p in params])
+    y_base = np.array([p[0][1] for p in params])
+    height = np.array([p[1] for p in params])
+    thickness = np.array([p[2] for p in params], dtype=float)
+    trunk_height = np.array([p[3] for p in params])
+    tan = np.tan(np.array([p[4] for p in params], dtype=float))
+    height_new = (height * np.array([p[5] for p in params], dtype=float)).astype(int)
+
+    # 木ごとの行を展開する: 木 i について start[i] から count[i] 行（step 行おき）
+    def rows(start, count, step=1):
+        count = np.maximum(count, 0)
+        tree = np.repeat(np.arange(len(params)), count)
+        row = start[tree] + step * (np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count))
+        return tree, row
+
+    # 葉
+    leaf_tree, leaf_y = rows(trunk_height, height_new - trunk_height)
+    leaf_width = (tan[leaf_tree] * (height_new[leaf_tree] - leaf_y)).astype(int)
+    # 幹（根元で太さ thickness、上に行くほど細くなる）
+    trunk_tree, trunk_y = rows(y_base, height + 1)
+    trunk_rise = trunk_y if absolute_trunk else trunk_y - y_base[trunk_tree]
+    trunk_width = np.floor(thickness[trunk_tree] / height[trunk_tree] * (height[trunk_tree] - trunk_rise)).astype(int) + 1
+    # 枝（3行おき）
+    branch_start = trunk_height + 2
+    branch_tree, branch_y = rows(branch_start, (height - branch_start + 2) // 3, 3)
+    branch_width = (tan[branch_tree] * (height[branch_tree] - branch_y)).astype(int)
+
+    tree = np.concatenate([leaf_tree, trunk_tree, branch_tree])
+    part = np.concatenate([np.zeros_like(leaf_tree), np.ones_like(trunk_tree), np.full_like(branch_tree, 2)])
+    center = x_base[tree]
+    width = np.concatenate([leaf_width, trunk_width, branch_width])
+    spans = {
+        "y": np.concatenate([y_base[leaf_tree] + leaf_y, trunk_y, y_base[branch_tree] + branch_y]),
+        "x0": center - width,
+        "x1": center + width,
+        "material": np.concatenate([np.full_like(leaf_tree, LEAF), np.full_like(trunk_tree, WOOD),
+                                    np.full_like(branch_tree, WOOD)]),
+        "time": np.concatenate([np.ones(leaf_tree.size), np.zeros(trunk_tree.size + branch_tree.size)]),
+    }
+    # 木の順番、木の中では葉・幹・枝の順に並べる（後ろほど優先）
+    order = np.argsort(tree * 3 + part, kind='stable')
+    return {key: value[order] for key, value in spans.items()}
+
+# 木をまとめて書き込む
+def fill_trees(grid, trees, sharpness=np.pi / 12, ratio=1.2, absolute_trunk=False):
+    fill_spans(grid, tree_spans(trees, sharpness, ratio, absolute_trunk))
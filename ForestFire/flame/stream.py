@@ -0,0 +1,114 @@
+import collections
+import queue
+import struct
+import subprocess
+import sys
+import threading
+import numpy as np
+
+from cells import CELL_DTYPE
+
+# シミュレーターからステップごとのセルをファイルを介さずに受け取る
+# フレームは「ヘッダ (MAGIC, ステップ番号, 幅, 高さ) + セルデータ（cells_state_step_N.bin と同じ並び）」で、
+# system.cpp --stream や publish() がパイプ（標準出力）に書き出す
+MAGIC = b'FFST'
+FRAME_HEADER = struct.Struct('<4sIII')
+
+# 1フレームを書き出す
+def write_frame(file, step, cells):
+    width, height = cells.shape
+    file.write(FRAME_HEADER.pack(MAGIC, step, width, height))
+    file.write(np.ascontiguousarray(cells, dtype=CELL_DTYPE).tobytes())
+    file.flush()
+
+# ちょうど size バイト読む（途中で終わったら None）
+def _read_exactly(file, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = file.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+# 1フレームを読み、(ステップ番号, (width, height) の構造化配列) を返す（ストリームの終わりなら None）
+def read_frame(file):
+    header = _read_exactly(file, FRAME_HEADER.size)
+    if header is None:
+        return None
+    magic, step, width, height = FRAME_HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"フレームの先頭が {MAGIC!r} ではありません: {magic!r}")
+    data = _read_exactly(file, width * height * CELL_DTYPE.itemsize)
+    if data is None:
+        raise ValueError(f"ステップ {step} のフレームが途中で終わっています")
+    return step, np.frombuffer(data, dtype=CELL_DTYPE).reshape(width, height)
+
+# フレームを届いた順に返すジェネレーター
+# 読み込みは別スレッドで行い、最大 buffer フレームまでためる。
+# drop=False なら受け取り側が遅れるとパイプが詰まってシミュレーターが待つ（バックプレッシャー）。
+# drop=True なら古いフレームを捨てて、常に新しいフレームから受け取る（表示用）
+def read_frames(file, buffer=8, drop=False):
+    frames = collections.deque(maxlen=buffer) if drop else queue.Queue(buffer)
+    ready = threading.Condition()
+    finished = []
+
+    def reader():
+        try:
+            while True:
+                frame = read_frame(file)
+                if frame is None:
+                    break
+                if drop:
+                    with ready:
+                        frames.append(frame)
+                        ready.notify()
+                else:
+                    frames.put(frame)
+        except Exception as error:
+            finished.append(error)
+        finally:
+            finished.append(None)
+            if drop:
+                with ready:
+                    ready.notify()
+            else:
+                frames.put(None)
+
+    threading.Thread(target=reader, daemon=True).start()
+    while True:
+        if drop:
+            with ready:
+                ready.wait_for(lambda: frames or finished)
+                frame = frames.popleft() if frames else None
+        else:
+            frame = frames.get()
+        if frame is None:
+            break
+        yield frame
+    if finished[0] is not None:
+        raise finished[0]
+
+# コマンド（例: ['./system', '--stream']）を実行し、標準出力に流れてくるフレームを返すジェネレーター
+def stream_process(command, cwd=None, buffer=8, drop=False):
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE)
+    try:
+        yield from read_frames(process.stdout, buffer, drop)
+    finally:
+        process.stdout.close()
+        if process.wait() not in (0, -13):  # 途中で読むのをやめたとき（SIGPIPE）は失敗にしない
+            raise RuntimeError(f"シミュレーターが終了コード {process.returncode} で終わりました: {command}")
+
+# FireSimulation を steps ステップ進め、各ステップをフレームとして file（既定は標準出力）に書き出す
+def publish(sim, steps, file=None):
+    file = file or sys.stdout.buffer
+    for _ in sim.run(steps):
+        write_frame(file, sim.step_count, sim.to_cells())
+
+if __name__ == '__main__':
+    import os
+    from fire import FireSimulation
+
+    # python stream.py で fire.py のシミュレーションを標準出力に流す（python stream.py | 受け取り側）
+    directory = os.path.dirname(os.path.abspath(__file__))
+    publish(FireSimulation.from_file(os.path.join(directory, 'cells_state.bin'), 150, 100), 100)
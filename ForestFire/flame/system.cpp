@@ -5,6 +5,11 @@
 #include <cmath>     // std::max
 #include <cstdint>   // for uint8_t
 #include <limits>    // for std::numeric_limits
+#include <string>
+#ifdef _WIN32
+#include <fcntl.h>   // for _O_BINARY
+#include <io.h>      // for _setmode
+#endif
 
 // 素材の種類
 enum Material {
@@ -49,6 +54,17 @@ struct Cell {
     float time;     // 燃焼時間 [s]
 };
 
+// ストリーミング時に各ステップのセルデータの前に書くヘッダ
+struct FrameHeader {
+    char magic[4];   // "FFST"
+    uint32_t step;   // ステップ番号（1から）
+    uint32_t width;
+    uint32_t height;
+};
+
+// 進行状況の出力先（ストリーミング時は標準出力をフレーム専用にするため標準エラー出力にする）
+std::ostream* logOutput = &std::cout;
+
 // ファイルからセルデータを読み込む
 void loadCellsFromFile(const std::string& filename, std::vector<std::vector<Cell>>& cells) {
     std::ifstream file(filename, std::ios::binary);
@@ -62,7 +78,7 @@ void loadCellsFromFile(const std::string& filename, std::vector<std::vector<Cell
     }
 
     file.close();
-    std::cout << "File loaded: " << filename << std::endl;
+    *logOutput << "File loaded: " << filename << std::endl;
 }
 
 // セルデータをファイルに保存
@@ -78,7 +94,18 @@ void saveCellsToFile(const std::string& filename, const std::vector<std::vector<
     }
 
     file.close();
-    std::cout << "File saved: " << filename << std::endl;
+    *logOutput << "File saved: " << filename << std::endl;
+}
+
+// セルデータをヘッダ付きのフレームとしてストリーム（標準出力）に書き出す
+void saveCellsToStream(std::ostream& out, int step, const std::vector<std::vector<Cell>>& cells) {
+    FrameHeader header = {{'F', 'F', 'S', 'T'}, static_cast<uint32_t>(step),
+                          static_cast<uint32_t>(cells.size()), static_cast<uint32_t>(cells[0].size())};
+    out.write(reinterpret_cast<const char*>(&header), sizeof(header));
+    for (const auto& row : cells) {
+        out.write(reinterpret_cast<const char*>(row.data()), row.size() * sizeof(Cell));
+    }
+    out.flush();
 }
 
 // セルの温度更新処理 (1世代分の処理①)
@@ -176,9 +203,17 @@ void ifIgnite(std::vector<std::vector<Cell>>& cells) {
     }
 }
 
-int main() {
+// 引数に --stream を付けると、ステップごとのファイルを作らずに標準出力へフレームを流す
+int main(int argc, char* argv[]) {
     const int width = 150;
     const int height = 100;
+    const bool stream = argc > 1 && std::string(argv[1]) == "--stream";
+    if (stream) {
+        logOutput = &std::cerr;
+#ifdef _WIN32
+        _setmode(_fileno(stdout), _O_BINARY);
+#endif
+    }
 
     // セルの初期化
     std::vector<std::vector<Cell>> cells(width, std::vector<Cell>(height));
@@ -192,11 +227,15 @@ int main() {
         updateTemperature(cells); // 処理①: 温度更新
         ifIgnite(cells);          // 処理②: 発火判定
 
-        // 1ステップごとにセルデータを保存
-        std::string filename = "cells_state_step_" + std::to_string(step + 1) + ".bin";
-        saveCellsToFile(filename, cells);
+        // 1ステップごとにセルデータを保存（ストリーミング時は標準出力へ）
+        if (stream) {
+            saveCellsToStream(std::cout, step + 1, cells);
+        } else {
+            std::string filename = "cells_state_step_" + std::to_string(step + 1) + ".bin";
+            saveCellsToFile(filename, cells);
+        }
 
-        std::cout << "Step " << step + 1 << " completed." << std::endl;
+        *logOutput << "Step " << step + 1 << " completed." << std::endl;
     }
 
     return 0;
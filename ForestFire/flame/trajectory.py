@@ -0,0 +1,165 @@
+import json
+import struct
+import zlib
+import numpy as np
+
+from cells import CELL_DTYPE, materialProperties, read_cells
+
+# 全ステップを1つのファイルにまとめる形式
+#
+#   先頭:   MAGIC | ヘッダ長 (uint32) | ヘッダ (JSON: 幅・高さ・dtype・素材テーブルなど)
+#   本体:   ステップごとの圧縮チャンク
+#   末尾:   索引 (ステップ数 × INDEX_ENTRY) | 索引の位置 (uint64) | ステップ数 (uint64) | MAGIC
+#
+# チャンクはフィールドごとに並べ替えたバイト列を zlib で圧縮したもの。
+# キーフレーム以外は直前のキーフレームとの XOR を圧縮するので、変化しない空気や土のセルは
+# ほぼ 0 になってよく縮む。どのステップもキーフレームと自分のチャンクの2つだけで復元できる。
+MAGIC = b'FFTRAJ01'
+INDEX_ENTRY = struct.Struct('<QIB')  # オフセット, サイズ, 種類
+FOOTER = struct.Struct('<QQ8s')
+KEYFRAME = 0
+DELTA = 1
+
+# 構造化配列をフィールドごとに並べた uint32 配列にする（同じフィールドが連続すると圧縮しやすい）
+def _to_planes(cells):
+    return np.stack([np.ascontiguousarray(cells[name]).view(np.uint32) for name in CELL_DTYPE.names])
+
+def _from_planes(planes, width, height):
+    cells = np.empty((width, height), dtype=CELL_DTYPE)
+    for name, plane in zip(CELL_DTYPE.names, planes):
+        cells[name] = plane.view(np.float32).reshape(width, height)
+    return cells
+
+# 軌跡ファイルの書き込み
+class TrajectoryWriter:
+    def __init__(self, filename, width, height, properties=materialProperties, keyframe_interval=50, level=6):
+        self.width = width
+        self.height = height
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self._file = open(filename, 'wb')
+        self._index = []
+        self._keyframe = None
+
+        header = json.dumps({
+            "width": width,
+            "height": height,
+            "dtype": CELL_DTYPE.descr,
+            "keyframe_interval": keyframe_interval,
+            "compression": "zlib",
+            "materialProperties": properties,
+        }).encode('utf-8')
+        self._file.write(MAGIC)
+        self._file.write(struct.pack('<I', len(header)))
+        self._file.write(header)
+
+    def __len__(self):
+        return len(self._index)
+
+    # 1ステップ分のセルを追加する
+    def write(self, cells):
+        if cells.shape != (self.width, self.height):
+            raise ValueError(f"セルの形が ({self.width}, {self.height}) ではありません: {cells.shape}")
+        planes = _to_planes(cells)
+        if len(self._index) % self.keyframe_interval == 0:
+            self._keyframe = planes
+            kind, payload = KEYFRAME, planes
+        else:
+            kind, payload = DELTA, planes ^ self._keyframe
+        chunk = zlib.compress(payload.tobytes(), self.level)
+        self._index.append((self._file.tell(), len(chunk), kind))
+        self._file.write(chunk)
+
+    def close(self):
+        if self._file.closed:
+            return
+        index_offset = self._file.tell()
+        for entry in self._index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+        self._file.write(FOOTER.pack(index_offset, len(self._index), MAGIC))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# 軌跡ファイルの読み込み（末尾の索引から任意のステップへ直接シークする）
+class TrajectoryReader:
+    def __init__(self, filename):
+        self._file = open(filename, 'rb')
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f"{filename} は軌跡ファイルではありません")
+        header_size, = struct.unpack('<I', self._file.read(4))
+        self.header = json.loads(self._file.read(header_size))
+        self.width = self.header["width"]
+        self.height = self.header["height"]
+        self.properties = self.header["materialProperties"]
+
+        self._file.seek(-FOOTER.size, 2)
+        index_offset, steps, magic = FOOTER.unpack(self._file.read(FOOTER.size))
+        if magic != MAGIC:
+            self._file.close()
+            raise ValueError(f"{filename} の索引が壊れています（書き込み途中で終了した可能性があります）")
+        self._file.seek(index_offset)
+        self._index = list(INDEX_ENTRY.iter_unpack(self._file.read(steps * INDEX_ENTRY.size)))
+        self._keyframe_position = None
+        self._keyframe = None
+
+    def __len__(self):
+        return len(self._index)
+
+    def _read_planes(self, position):
+        offset, size, kind = self._index[position]
+        self._file.seek(offset)
+        data = zlib.decompress(self._file.read(size))
+        return kind, np.frombuffer(data, dtype=np.uint32).reshape(len(CELL_DTYPE.names), -1)
+
+    # 0 から数えた position 番目のステップを (width, height) の構造化配列で返す
+    def read(self, position):
+        if position < 0:
+            position += len(self._index)
+        if not 0 <= position < len(self._index):
+            raise IndexError(f"ステップ {position} は範囲外です")
+        kind, planes = self._read_planes(position)
+        if kind == KEYFRAME:
+            self._keyframe_position, self._keyframe = position, planes
+        else:
+            keyframe_position = position - position % self.header["keyframe_interval"]
+            if self._keyframe_position != keyframe_position:
+                self._keyframe_position = keyframe_position
+                self._keyframe = self._read_planes(keyframe_position)[1]
+            planes = planes ^ self._keyframe
+        return _from_planes(planes, self.width, self.height)
+
+    def __getitem__(self, position):
+        return self.read(position)
+
+    def __iter__(self):
+        for position in range(len(self._index)):
+            yield self.read(position)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# system.cpp が書き出した cells_state_step_{n}.bin をまとめて1つの軌跡ファイルにする
+def convert_step_files(filename_format, width, height, steps, output, properties=materialProperties):
+    with TrajectoryWriter(output, width, height, properties) as writer:
+        for step in range(steps):
+            writer.write(read_cells(filename_format.format(step + 1), width, height))
+    return output
+
+if __name__ == '__main__':
+    import os
+    directory = os.path.dirname(os.path.abspath(__file__))
+    output = convert_step_files(os.path.join(directory, 'cells_state_step_{}.bin'), 150, 100, 100,
+                                os.path.join(directory, 'cells_state.traj'))
+    print(f"File saved: {output} ({os.path.getsize(output)} bytes)")
@@ -0,0 +1,152 @@
+import functools
+import numpy as np
+
+from cells import SOIL, environment, materialProperties, read_cells
+from fire import FireSimulation, NEIGHBOURS, shifted
+
+# 風と斜面による延焼の向きの偏り
+# 周囲のセルから受け取るエネルギーに、火が進む向き（出すセル → 受け取るセル）と「駆動ベクトル」
+# （風と、斜面を登る向きの和）がそろうほど大きくなる重みを掛ける。無風・平地ではすべての重みが 1 で、
+# FireSimulation と同じ結果になる。強い風のときは風下側だけ2セル以上先まで届く広いカーネルにする
+#
+# 駆動ベクトルは DRIVE_RESOLUTION 刻みに丸めてからカーネルを作り、LRU キャッシュで使い回す。
+# 重みは最初に1回だけ作っておく。一様な風ならスカラーのままで、場所によって風が違うときだけセルごとの配列にする
+
+WIND_FACTOR = 0.1  # 風速 1 m/s あたりの駆動の強さ
+SLOPE_FACTOR = 1.0  # 斜面の傾き（tan）1 あたりの駆動の強さ
+DRIVE_PER_RING = 1.0  # 駆動の強さがこれだけ増えるごとにカーネルを1セル広げる
+MAX_RADIUS = 3
+OUTER_DECAY = 0.5  # 1セル外側に行くごとに重みに掛ける値
+DRIVE_RESOLUTION = 0.05
+KERNEL_CACHE_SIZE = 64
+
+# 環境条件の風を (x, y) のベクトル [m/s] にする（windDirection は度、0 で +x 向き）
+def wind_vector(env=environment):
+    angle = np.deg2rad(env.get("windDirection", 0.0))
+    return env["windSpeed"] * np.cos(angle), env["windSpeed"] * np.sin(angle)
+
+# 各列の地面の高さ（一番上の土のセルの1つ上、土がなければ 0）
+def ground_heights(material):
+    soil = material == SOIL
+    top = soil.shape[1] - np.argmax(soil[:, ::-1], axis=1)
+    return np.where(soil.any(axis=1), top, 0)
+
+# 各列の斜面を登る向きのベクトル（地面に沿った単位ベクトル × 傾き tan）
+def slope_vectors(material):
+    gradient = np.gradient(ground_heights(material).astype(float)) if material.shape[0] > 1 else np.zeros(1)
+    norm = np.hypot(1.0, gradient)
+    return np.stack([gradient / norm, gradient * gradient / norm], axis=1)
+
+# 丸めた駆動ベクトル (qx, qy) × DRIVE_RESOLUTION のカーネル（(2r+1, 2r+1)、[dx + r, dy + r] が (dx, dy) の近傍の重み）
+@functools.lru_cache(maxsize=KERNEL_CACHE_SIZE)
+def _cached_kernel(qx, qy):
+    drive = np.array([qx, qy]) * DRIVE_RESOLUTION
+    strength = np.hypot(*drive)
+    radius = min(MAX_RADIUS, 1 + int(strength // DRIVE_PER_RING))
+    dx, dy = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    distance = np.hypot(dx, dy)
+    distance[radius, radius] = 1.0
+    # (dx, dy) のセルから中心のセルへ向かう向きと駆動ベクトルのそろい具合
+    alignment = -(drive[0] * dx + drive[1] * dy) / distance
+    weight = np.exp(alignment)
+    ring = np.maximum(np.abs(dx), np.abs(dy))
+    if radius > 1:
+        downwind = np.clip(alignment / strength, 0, None) ** 2
+        weight = np.where(ring > 1, weight * downwind * OUTER_DECAY ** (ring - 1), weight)
+    weight[radius, radius] = 0.0
+    kernel = weight.astype(np.float32)
+    kernel.flags.writeable = False
+    return kernel
+
+# 駆動ベクトル (x, y) のカーネル
+def spread_kernel(drive_x, drive_y):
+    return _cached_kernel(int(round(drive_x / DRIVE_RESOLUTION)), int(round(drive_y / DRIVE_RESOLUTION)))
+
+# 風と斜面を考えた森林火災シミュレーション
+# wind は (x, y) のベクトル、またはセルごとの (width, height, 2) の配列（省略すると environment の風）
+# slope=False なら斜面の効果を入れない
+class WindFireSimulation(FireSimulation):
+    def __init__(self, cells, properties=materialProperties, frontier=False, wind=None, slope=True):
+        if frontier:
+            raise ValueError("WindFireSimulation は frontier モードに対応していません")
+        super().__init__(cells, properties)
+        wind = np.broadcast_to(np.asarray(wind_vector() if wind is None else wind, dtype=float),
+                               (self.width, self.height, 2))
+        drive = WIND_FACTOR * wind
+        if slope:
+            drive = drive + SLOPE_FACTOR * slope_vectors(self.material)[:, None, :]
+        self.drive = drive
+        self._build_stencil(drive)
+
+    # セルごとの駆動ベクトルから、近傍ごとの重みを作る
+    # 全セルで同じ重みならスカラー、条件が列ごとにしか変わらない（一様な風と斜面）なら (width, 1) の配列、
+    # 場所によって風が違うときだけセルごとの配列にする
+    def _build_stencil(self, drive):
+        quantized = np.round(drive / DRIVE_RESOLUTION).astype(int).reshape(-1, 2)
+        conditions, inverse = np.unique(quantized, axis=0, return_inverse=True)
+        kernels = [_cached_kernel(int(qx), int(qy)) for qx, qy in conditions]
+        radius = max(len(kernel) // 2 for kernel in kernels)
+        table = np.zeros((len(kernels), 2 * radius + 1, 2 * radius + 1), dtype=np.float32)
+        for table_kernel, kernel in zip(table, kernels):
+            r = len(kernel) // 2
+            table_kernel[radius - r:radius + r + 1, radius - r:radius + r + 1] = kernel
+
+        inverse = inverse.reshape(self.width, self.height)
+        if np.all(inverse == inverse[:, :1]):
+            inverse = inverse[:, :1]
+
+        # 周囲8セルは全セル版と同じ順番で足し、その外側は後から足す
+        outer = [(dx, dy) for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1)
+                 if max(abs(dx), abs(dy)) > 1]
+        self.stencil = []
+        for dx, dy in NEIGHBOURS + outer:
+            weights = table[:, dx + radius, dy + radius]
+            if not weights.any():
+                continue
+            if np.all(weights == weights[0]):
+                weight = weights[0]
+            else:
+                weight = weights[inverse]
+            self.stencil.append((dx, dy, weight))
+        self.conditions = len(conditions)
+        self.radius = radius
+
+    # 処理①: 周囲のセルの排出エネルギーに重みを掛けて足し込む（x0 <= x < x1 の列）
+    # 周囲8セルは FireSimulation と同じく、まわりに1セルの余白がある配列をずらして全体を足す
+    def _update_temperature_columns(self, x0, x1):
+        energy_sum = np.zeros((x1 - x0, self.height), dtype=np.float32)
+        for dx, dy, weight in self.stencil:
+            if max(abs(dx), abs(dy)) <= 1:
+                tx0, tx1, ty0, ty1 = x0, x1, 0, self.height
+                source = shifted(self._emit, dx, dy, x0, x1)
+            else:
+                tx0, tx1 = max(x0, -dx), min(x1, self.width - dx)
+                ty0, ty1 = max(0, -dy), min(self.height, self.height - dy)
+                if tx0 >= tx1 or ty0 >= ty1:
+                    continue
+                source = self.emit[tx0 + dx:tx1 + dx, ty0 + dy:ty1 + dy]
+            if np.ndim(weight):
+                weight = weight[tx0:tx1] if weight.shape[1] == 1 else weight[tx0:tx1, ty0:ty1]
+                source = weight * source
+            elif weight != 1.0:
+                source = weight * source
+            energy_sum[tx0 - x0:tx1 - x0, ty0:ty1] += source
+        self.energy[x0:x1] += energy_sum
+
+if __name__ == '__main__':
+    import os
+    from cells import WOOD, BURNING, BURNED, NORMAL
+
+    # 木の根元に火をつけ、風と斜面の条件を変えて、着火点の左右で燃えたセルの数を比べる
+    directory = os.path.dirname(os.path.abspath(__file__))
+    scene = read_cells(os.path.join(directory, 'cells_state.bin'), 150, 100).copy()
+    scene['state'][38:43, 25:30] = np.where(scene['material'][38:43, 25:30] == WOOD, BURNING, NORMAL)
+    for wind, slope in [((0.0, 0.0), False), ((0.0, 0.0), True), ((10.0, 0.0), True), ((-10.0, 0.0), True),
+                        ((25.0, 0.0), True)]:
+        simulation = WindFireSimulation(scene, wind=wind, slope=slope)
+        for _ in simulation.run(200):
+            pass
+        reached = (simulation.state == BURNING) | (simulation.state == BURNED)
+        print(f"wind={wind} slope={slope}: 半径 {simulation.radius}, 条件 {simulation.conditions} 通り, "
+              f"左 {int(reached[:40].sum())} / 右 {int(reached[40:].sum())} セル")
+    print(_cached_kernel.cache_info())
@@ -0,0 +1,348 @@
+import math
+import numpy as np
+
+# 雪の結晶の多角形（(n, 2) の頂点配列、最後の頂点の次は最初の頂点）を扱う関数
+# どれも頂点ごとのループではなく、配列全体をまとめて計算する
+# 内積は np.vecdot で計算する（1頂点ずつの np.dot / np.linalg.norm と同じ丸めになる）
+
+# 各辺（頂点 i → 頂点 i+1）のベクトル
+def edge_vectors(vertex):
+    return np.roll(vertex, -1, axis=0) - vertex
+
+# 各辺の長さ
+def edge_lengths(vertex):
+    vec = edge_vectors(vertex)
+    return np.sqrt(np.vecdot(vec, vec))
+
+# 各辺を等間隔に分割して新しい頂点を計算する関数
+# 辺 i は int(長さ / new_interval) 等分し、元の頂点 i と分割点を順に並べる（元の1点ずつ追加する版と同じ結果）
+# 出力の大きさを先に求めて1回だけ確保し、分割点はまとめて補間する
+def plot_equal_interval(vertex, new_interval):
+    return _subdivide(vertex, edge_vectors(vertex), new_interval)
+
+# 始点 vertex[i] から vec[i] の向きに伸びる辺を分割する（plot_equal_interval と resample_wedge で共通）
+def _subdivide(vertex, vec, new_interval):
+    number_per_edge = (np.sqrt(np.vecdot(vec, vec)) / new_interval).astype(int)
+    count = np.maximum(number_per_edge, 1)  # 元の頂点 + 分割点の数
+
+    edge = np.repeat(np.arange(len(vertex)), count)
+    j = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+    divisor = np.maximum(number_per_edge, 1)[edge]
+    return vertex[edge] + vec[edge] * j[:, None] / divisor[:, None]
+
+# 各頂点 B で、前後の頂点 A, C へのベクトル BA, BC（A = 頂点 i-1, C = 頂点 i+1）
+def _neighbour_vectors(vertex):
+    return np.roll(vertex, 1, axis=0) - vertex, np.roll(vertex, -1, axis=0) - vertex
+
+# 長さ 0 のベクトルがあれば、最初の頂点番号を付けて ValueError にする
+def _unit(vec):
+    norm = np.sqrt(np.vecdot(vec, vec))
+    zero = np.flatnonzero(norm == 0)
+    if zero.size:
+        raise ValueError(f"Zero vector encountered at vertex {zero[0]}. Check input data.")
+    return vec / norm[:, None]
+
+# 全頂点の角 ABC の大きさ [度]（GrowingSnowflake.py の get_sharpness と同じ、凹凸は区別しない）
+def vertex_angles(vertex):
+    vec1, vec2 = _neighbour_vectors(vertex)
+    vec1_unit, vec2_unit = _unit(vec1), _unit(vec2)
+    dot_product = np.vecdot(vec1_unit, vec2_unit)
+    return np.degrees(np.arccos(dot_product))
+
+# 全頂点の外向きの二等分線の単位ベクトル（GrowingSnowflake.py の calculate_middle_angle と同じ）
+# BA と BC が逆向き（一直線）のときは BA に垂直な向きを使い、原点と反対側を向くように符号を決める
+def outward_bisectors(vertex):
+    vec1, vec2 = _neighbour_vectors(vertex)
+    vec1_unit, vec2_unit = _unit(vec1), _unit(vec2)
+    v = vec1_unit + vec2_unit
+    straight = (vec1_unit[:, 0] == -vec2_unit[:, 0]) & (vec1_unit[:, 1] == -vec2_unit[:, 1])
+    v[straight] = np.stack([-vec1_unit[straight, 1], vec1_unit[straight, 0]], axis=1)
+    inward = np.vecdot(v, vertex) <= 0
+    v[inward] = -v[inward]
+    return v / np.sqrt(np.vecdot(v, v))[:, None]
+
+# 角が border_sharpness 度以下の頂点の番号
+def sharp_vertices(vertex, border_sharpness):
+    return np.flatnonzero(vertex_angles(vertex) <= border_sharpness)
+
+# 全頂点の符号付きの角 [度]（ver2.py の get_sharpness と同じ、進む向きに対して右に曲がる頂点が 180 度未満）
+def signed_vertex_angles(vertex):
+    v1 = vertex - np.roll(vertex, 1, axis=0)
+    v2 = np.roll(vertex, -1, axis=0) - vertex
+    dot = np.vecdot(v1, v2)
+    det = v1[:, 0] * v2[:, 1] - v1[:, 1] * v2[:, 0]
+    return np.degrees(np.pi + np.arctan2(det, dot))
+
+# 全頂点の二等分線の単位ベクトル（ver2.py の calculate_middle_angle と同じ、v1 - v2 の向き）
+# 前後の辺がほぼ同じ（一直線）のときは辺に垂直な向きを使い、長さ 0 ならそのまま返す
+def edge_bisectors(vertex):
+    v1 = vertex - np.roll(vertex, 1, axis=0)
+    v2 = np.roll(vertex, -1, axis=0) - vertex
+    bisector = v1 - v2
+    straight = np.isclose(v1, v2).all(axis=1)
+    bisector[straight] = np.stack([v1[straight, 1], -v1[straight, 0]], axis=1)
+    norm = np.sqrt(np.vecdot(bisector, bisector))
+    nonzero = norm != 0
+    bisector[nonzero] /= norm[nonzero, None]
+    return bisector
+
+# 選んだ頂点 grow_vertex_num_list を中心に、前後 wideness / interval 個の頂点を二等分線の向きに grow_length 動かす
+# 元のスクリプトと同じく1頂点ずつ、それまでに動かした位置から向きを求める（窓が重なると後の頂点は動いた後の位置を見る）。
+# 選ぶ頂点はほとんどが前の頂点の窓の中にあって順番に依存するので、配列にまとめず、座標を Python の数のリストにして
+# 3頂点の向きと窓の足し込みをスカラーで計算する（numpy の小さな配列を1頂点ずつ作るより速く、丸めも同じ）
+# simultaneous=True が速い版: 全頂点の向きを動かす前の多角形から1回で求め、窓の移動量は np.add.at で1回で足し込む。
+# 窓が重なる頂点では、先に動いた頂点の位置を見ないぶん結果が変わる（grow_wedge はこちらと同じ成長）
+def grow_snowflake(vertex, grow_vertex_num_list, grow_length, wideness, interval, bisectors=outward_bisectors,
+                   simultaneous=False):
+    grow_vertex_num_list = np.asarray(grow_vertex_num_list, dtype=int)
+    wideness_range_abs = int(wideness / interval)
+    window = np.arange(-wideness_range_abs, wideness_range_abs + 1)
+    n = len(vertex)
+    if not grow_vertex_num_list.size:
+        return vertex
+    if simultaneous:
+        _grow_batch(vertex, bisectors(vertex)[grow_vertex_num_list] * grow_length, grow_vertex_num_list, window)
+        return vertex
+    bisector = _SCALAR_BISECTORS.get(bisectors)
+    if bisector is None:
+        # スカラー版のない向きの関数は1頂点ずつ配列で計算する
+        for i in grow_vertex_num_list:
+            vec = bisectors(vertex[[(i - 1) % n, i, (i + 1) % n]])[1]
+            np.add.at(vertex, (i + window) % n, vec * grow_length)
+        return vertex
+    x, y = vertex[:, 0].tolist(), vertex[:, 1].tolist()
+    offsets = window.tolist()
+    for i in grow_vertex_num_list.tolist():
+        a, b, c = (i - 1) % n, i % n, (i + 1) % n
+        vx, vy = bisector(x[a], y[a], x[b], y[b], x[c], y[c])
+        dx, dy = vx * grow_length, vy * grow_length
+        for offset in offsets:
+            j = (i + offset) % n
+            x[j] += dx
+            y[j] += dy
+    vertex[:, 0] = x
+    vertex[:, 1] = y
+    return vertex
+
+# 頂点 grow の窓に移動量 vec を足し込む（窓が重なる頂点には grow の順に足す）
+def _grow_batch(vertex, vec, grow, window):
+    target = (grow[:, None] + window) % len(vertex)
+    np.add.at(vertex, target.ravel(), np.repeat(vec, window.size, axis=0))
+
+# 2次元の内積を np.vecdot と同じ丸めで計算する関数を選ぶ
+# numpy のビルドや CPU によっては x0 * x1 + y0 * y1 ではなく FMA（y0 * y1 + (x0 * x1) を1回の丸めで）を使うので、
+# いくつかの値で確かめてから、同じになる計算を使う（どちらでもなければ1回ずつ np.vecdot を呼ぶ）
+def _scalar_dot():
+    a, b = np.random.default_rng(0).standard_normal((2, 256, 2))
+    expected = np.vecdot(a, b).tolist()
+    pairs = list(zip(a.tolist(), b.tolist()))
+    if expected == [x0 * x1 + y0 * y1 for (x0, y0), (x1, y1) in pairs]:
+        return lambda x0, y0, x1, y1: x0 * x1 + y0 * y1
+    fma = getattr(math, 'fma', None)
+    if fma is not None and expected == [fma(y0, y1, x0 * x1) for (x0, y0), (x1, y1) in pairs]:
+        return lambda x0, y0, x1, y1: fma(y0, y1, x0 * x1)
+    return lambda x0, y0, x1, y1: float(np.vecdot((x0, y0), (x1, y1)))
+
+_dot = _scalar_dot()
+
+# outward_bisectors を前 A・自分 B・次 C の3頂点に使ったときの B の向き（同じ順番の演算で同じ値になる）
+def _outward_bisector(ax, ay, bx, by, cx, cy):
+    x1, y1, x2, y2, x3, y3 = ax - bx, ay - by, cx - bx, cy - by, cx - ax, cy - ay
+    n1, n2 = math.sqrt(_dot(x1, y1, x1, y1)), math.sqrt(_dot(x2, y2, x2, y2))
+    # 3頂点版は A から C へのベクトルも単位ベクトルにするので、A = C のときも同じく ValueError にする
+    if n1 == 0 or n2 == 0 or _dot(x3, y3, x3, y3) == 0:
+        raise ValueError("Zero vector encountered. Check input data.")
+    u1x, u1y, u2x, u2y = x1 / n1, y1 / n1, x2 / n2, y2 / n2
+    if u1x == -u2x and u1y == -u2y:
+        vx, vy = -u1y, u1x
+    else:
+        vx, vy = u1x + u2x, u1y + u2y
+    if _dot(vx, vy, bx, by) <= 0:
+        vx, vy = -vx, -vy
+    norm = math.sqrt(_dot(vx, vy, vx, vy))
+    return vx / norm, vy / norm
+
+# edge_bisectors を3頂点に使ったときの B の向き（np.isclose と同じ許容誤差で一直線を判定する）
+def _edge_bisector(ax, ay, bx, by, cx, cy):
+    x1, y1, x2, y2 = bx - ax, by - ay, cx - bx, cy - by
+    if abs(x1 - x2) <= 1e-8 + 1e-5 * abs(x2) and abs(y1 - y2) <= 1e-8 + 1e-5 * abs(y2):
+        vx, vy = y1, -x1
+    else:
+        vx, vy = x1 - x2, y1 - y2
+    norm = math.sqrt(_dot(vx, vy, vx, vy))
+    if norm != 0:
+        vx, vy = vx / norm, vy / norm
+    return vx, vy
+
+_SCALAR_BISECTORS = {outward_bisectors: _outward_bisector, edge_bisectors: _edge_bisector}
+
+# D6 対称（60 度ごとの回転と鏡映）な結晶を、基本領域の 30 度のくさびだけで扱う関数
+# くさびは頂点の折れ線 wedge[0..m] で、wedge[0] は 0 度の鏡映線（x 軸）上、wedge[m] は 30 度の鏡映線上にある
+# 全体の多角形（12m 頂点）は、くさびと 30 度の線で折り返したものを 60 度ずつ回して並べ、
+# スクリプトの初期六角形と同じ時計回りにしたもの（頂点 0 が wedge[0]、頂点 -k が wedge[k]）
+MIRROR_ANGLE = np.pi / 6
+
+# 原点を通る角度 angle の直線で折り返す
+def _reflect(points, angle):
+    c, s = np.cos(2 * angle), np.sin(2 * angle)
+    return np.stack([c * points[..., 0] + s * points[..., 1], s * points[..., 0] - c * points[..., 1]], axis=-1)
+
+# 原点のまわりに angle 回す（angle は点ごとの配列でもよい）
+def _rotate(points, angle):
+    c, s = np.cos(angle), np.sin(angle)
+    return np.stack([c * points[..., 0] - s * points[..., 1], s * points[..., 0] + c * points[..., 1]], axis=-1)
+
+# 正六角形（頂点が (radius, 0)）のくさび: 頂点から辺の中点まで
+def hexagon_wedge(radius=1.0):
+    return np.array([[radius, 0.0], [radius * 3 / 4, radius * np.sqrt(3) / 4]])
+
+# 全体の多角形の index 番目（負の番号や 12m 以上は一周して数える）の頂点を、くさびから直接求める
+def unfold_wedge(wedge, index=None):
+    m = len(wedge) - 1
+    if index is None:
+        index = np.arange(12 * m)
+    index = -np.asarray(index) % (12 * m)  # 反時計回りに並べたときの番号
+    piece, local = np.divmod(index, 2 * m)
+    mirrored = local > m
+    points = wedge[np.where(mirrored, 2 * m - local, local)]
+    points[mirrored] = _reflect(points[mirrored], MIRROR_ANGLE)
+    return _rotate(points, piece * 2 * MIRROR_ANGLE)
+
+# 端点を鏡映線の上に戻す（成長で計算誤差がたまって線から離れないように）
+def _snap_to_mirrors(wedge):
+    wedge[0, 1] = 0.0
+    direction = np.array([np.cos(MIRROR_ANGLE), np.sin(MIRROR_ANGLE)])
+    wedge[-1] = np.dot(wedge[-1], direction) * direction
+    return wedge
+
+# くさびの折れ線を、plot_equal_interval と同じ規則（辺ごとに int(長さ / new_interval) 等分）で分割する
+# 全体を展開してから plot_equal_interval したものとは一致しない。辺の長さが new_interval のほぼ倍数だと、
+# 回転・折り返しの丸め誤差で切り捨ての結果が変わり、頂点の数がずれる（初期六角形と 0.02 では 288 と 291）
+def resample_wedge(wedge, new_interval):
+    return np.vstack([_subdivide(wedge[:-1], np.diff(wedge, axis=0), new_interval), wedge[-1:]])
+
+# くさびのまま grow_snowflake(..., simultaneous=True) と同じ成長をさせる。角が 0〜border_sharpness 度の頂点を選んで窓を動かす
+# 鏡映線の向こう側の頂点（窓の幅 + 1 個）を折り返して両側に付け足し、境界をまたぐ窓や角の計算も全体と同じにする
+def grow_wedge(wedge, grow_length, wideness, interval, border_sharpness, angles=vertex_angles,
+               bisectors=outward_bisectors):
+    m = len(wedge) - 1
+    pad = int(wideness / interval) + 1
+    padded = unfold_wedge(wedge, np.arange(-m - pad, pad + 1))  # padded[pad + k] が wedge[m - k]
+    sharpness = angles(padded)[1:-1]  # 両端は隣が足りないので使わない
+    grow_vertex_num_list = np.flatnonzero((0 <= sharpness) & (sharpness <= border_sharpness)) + 1
+
+    wideness_range_abs = int(wideness / interval)
+    window = np.arange(-wideness_range_abs, wideness_range_abs + 1)
+    vec = bisectors(padded)[grow_vertex_num_list] * grow_length
+    target = (grow_vertex_num_list[:, None] + window).ravel()
+    vec = np.repeat(vec, window.size, axis=0)
+    inside = (target >= pad) & (target <= pad + m)
+    moved = padded[pad:pad + m + 1].copy()
+    np.add.at(moved, target[inside] - pad, vec[inside])
+    return _snap_to_mirrors(moved[::-1])
+
+# 2次元の外積 a x b
+def _cross(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[...,0]
+
+# 頂点が動いた辺（辺 i は頂点 i → 頂点 i+1）のマスク。grow_snowflake の前後の頂点から、調べ直す辺を決めるのに使う
+def changed_segments(before, after):
+    moved = np.any(before != after, axis=1)
+    return moved | np.roll(moved, -1)
+
+# 交差しうる辺の組 (i, j), i < j を空間ハッシュで求める
+# 辺の外接矩形が重なる一辺 cell のマスに辺を登録し、同じマスに入った辺同士だけを組にする
+# moved（辺のマスク）を渡すと、少なくとも片方が moved の組だけを返す
+def _candidate_pairs(vertex, cell, moved=None):
+    n = len(vertex)
+    start, end = vertex, np.roll(vertex, -1, axis=0)
+    low = np.floor(np.minimum(start, end) / cell).astype(np.int64)
+    high = np.floor(np.maximum(start, end) / cell).astype(np.int64)
+    low_all = low.min(axis=0)
+    low, high = low - low_all, high - low_all
+    rows = high[:, 1].max() + 1
+    size = high - low + 1
+    count = size[:, 0] * size[:, 1]
+
+    # 辺ごとに外接矩形のマスを展開して (マスの番号, 辺) の並びを作り、マスの番号で並べる
+    segment = np.repeat(np.arange(n), count)
+    offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+    gx = low[segment, 0] + offset // size[segment, 1]
+    gy = low[segment, 1] + offset % size[segment, 1]
+    key = gx * rows + gy
+    order = np.argsort(key, kind='stable')
+    key, segment = key[order], segment[order]
+
+    # 同じマスの中の組を、並びの上で d 個離れたもの同士として d = 1, 2, ... と順に取り出す
+    first, second = [], []
+    d = 1
+    while d < len(key):
+        same = np.flatnonzero(key[:-d] == key[d:])
+        if not same.size:
+            break
+        first.append(segment[same])
+        second.append(segment[same + d])
+        d += 1
+    if not first:
+        return np.zeros((0, 2), dtype=np.int64)
+    i, j = np.concatenate(first), np.concatenate(second)
+    i, j = np.minimum(i, j), np.maximum(i, j)
+    keep = (j - i > 1) & ~((i == 0) & (j == n - 1))  # 同じ辺・隣り合う辺は除く
+    if moved is not None:
+        keep &= moved[i] | moved[j]
+    pairs = np.unique(i[keep] * n + j[keep])
+    return np.stack([pairs // n, pairs % n], axis=1)
+
+# 多角形の辺の交差（自己交差）を調べ、交わる辺の組 (i, j), i < j を返す（端が触れるだけのものも含む）
+# cell は空間ハッシュのマスの大きさで、plot_equal_interval の分割間隔くらいにする（None なら辺の長さの中央値）
+# moved は成長で動いた辺のマスク（changed_segments）で、渡すとそれに関わる組だけを調べる
+def find_self_intersections(vertex, cell=None, moved=None):
+    if cell is None:
+        cell = np.median(edge_lengths(vertex))
+    pairs = _candidate_pairs(vertex, cell, moved)
+    end = np.roll(vertex, -1, axis=0)
+    p1, q1 = vertex[pairs[:, 0]], end[pairs[:, 0]]
+    p2, q2 = vertex[pairs[:, 1]], end[pairs[:, 1]]
+    d1, d2 = q1 - p1, q2 - p2
+    straddle1 = _cross(d1, p2 - p1) * _cross(d1, q2 - p1) <= 0
+    straddle2 = _cross(d2, p1 - p2) * _cross(d2, q1 - p2) <= 0
+    # 一直線上に並ぶ場合のために外接矩形も重なることを確かめる
+    overlap = np.all((np.minimum(p1, q1) <= np.maximum(p2, q2)) & (np.minimum(p2, q2) <= np.maximum(p1, q1)), axis=1)
+    return pairs[straddle1 & straddle2 & overlap]
+
+# 自己交差を、交点で輪を切り取って直す。多角形は交点で2つの輪に分かれるので、面積の小さい方の輪を取り除き、交点を1つ置く
+# 取り除く範囲が重なる交差は次の回にまわし、交差がなくなるまで（最大 max_rounds 回）繰り返す
+def repair_self_intersections(vertex, cell=None, moved=None, max_rounds=10):
+    for _ in range(max_rounds):
+        pairs = find_self_intersections(vertex, cell, moved)
+        if not pairs.size:
+            break
+        n = len(vertex)
+        end = np.roll(vertex, -1, axis=0)
+        # 靴ひも公式の累積和（頂点 a から b までの辺の項の和を2回の引き算で求める）
+        twice_area = np.concatenate([[0.0], np.cumsum(_cross(vertex, end))])
+        keep = np.ones(n, dtype=bool)
+        touched = np.zeros(n, dtype=bool)
+        vertex = vertex.copy()
+        for i, j in pairs:
+            # 辺 i と辺 j の交点
+            d1, d2 = end[i] - vertex[i], end[j] - vertex[j]
+            denominator = _cross(d1, d2)
+            t = _cross(vertex[j] - vertex[i], d2) / denominator if denominator != 0 else 1.0
+            point = vertex[i] + t * d1
+            # 頂点 i+1..j の輪（交点 → i+1 → ... → j → 交点）と残りの輪のうち、面積の小さい方を交点1つに置き換える
+            inner = twice_area[j] - twice_area[i + 1] + _cross(point, vertex[i + 1]) + _cross(vertex[j], point)
+            if abs(inner) <= abs(twice_area[-1] - inner):
+                loop = np.arange(i + 1, j + 1)
+            else:
+                loop = np.arange(j + 1, i + n + 1) % n
+            ends = [i, (i + 1) % n, j, (j + 1) % n]
+            if touched[loop].any() or touched[ends].any():
+                continue
+            vertex[loop[0]] = point
+            keep[loop[1:]] = False
+            touched[loop] = True
+            touched[ends] = True
+        vertex = vertex[keep]
+        moved = None  # 頂点の番号が変わったので、次の回は全体を調べる
+    return vertex
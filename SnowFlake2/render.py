@@ -0,0 +1,61 @@
+import os
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.animation import FFMpegWriter, PillowWriter
+from matplotlib.figure import Figure
+from matplotlib.patches import Polygon
+
+# 雪の結晶の多角形を描く関数
+# 辺ごとに plt.plot するのではなく、閉じた多角形を1つのパス（Polygon）として、頂点は1回の scatter で描く
+
+MARKER_LIMIT = 5000  # 頂点がこれより多いときは頂点の印を描かない
+
+# ax に多角形を描き、(多角形, 頂点の印 または None) を返す
+def draw_snowflake(vertex, ax=None, marker_limit=MARKER_LIMIT):
+    if ax is None:
+        ax = plt.gca()
+    outline = ax.add_patch(Polygon(vertex, closed=True, fill=False, edgecolor='k'))
+    markers = None
+    if len(vertex) <= marker_limit:
+        markers = ax.scatter(vertex[:, 0], vertex[:, 1], c='red', s=5)  # 頂点を赤色で表示し、サイズを指定
+    ax.set_aspect('equal')  # アスペクト比を等しく
+    ax.autoscale_view()
+    return outline, markers
+
+# 世代ごとに1つずつ図を作って描く（表示はまとめて plt.show() で行う）
+def draw_generations(generations, marker_limit=MARKER_LIMIT):
+    figures = []
+    for vertex in generations:
+        fig, ax = plt.subplots()
+        draw_snowflake(vertex, ax, marker_limit)
+        figures.append(fig)
+    return figures
+
+# 画面に出さずにファイル（PNG / SVG / PDF など、拡張子で決まる）に保存する
+def save_snowflake(vertex, filename, marker_limit=MARKER_LIMIT, dpi=150):
+    fig = Figure(figsize=(6, 6))
+    draw_snowflake(vertex, fig.add_subplot(), marker_limit)
+    fig.savefig(filename, dpi=dpi)
+    return filename
+
+# 世代の並びを1つのアニメーション（.gif は Pillow、.mp4 は ffmpeg）に1世代1フレームで書き出す
+# 表示範囲は全世代を含むように固定し、フレームごとに多角形と頂点の座標だけを差し替える
+def save_growth_animation(generations, filename, fps=2, marker_limit=MARKER_LIMIT, dpi=100):
+    fig = Figure(figsize=(6, 6))
+    ax = fig.add_subplot()
+    points = np.concatenate(generations)
+    low, high = points.min(axis=0), points.max(axis=0)
+    margin = 0.05 * (high - low).max()
+    ax.set_xlim(low[0] - margin, high[0] + margin)
+    ax.set_ylim(low[1] - margin, high[1] + margin)
+    ax.set_aspect('equal')
+
+    outline = ax.add_patch(Polygon(generations[0], closed=True, fill=False, edgecolor='k'))
+    markers = ax.scatter([], [], c='red', s=5)
+    writer = PillowWriter(fps=fps) if os.path.splitext(filename)[1].lower() == '.gif' else FFMpegWriter(fps=fps)
+    with writer.saving(fig, filename, dpi):
+        for vertex in generations:
+            outline.set_xy(vertex)
+            markers.set_offsets(vertex if len(vertex) <= marker_limit else np.zeros((0, 2)))
+            writer.grab_frame()
+    return filename
@@ -0,0 +1,306 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+# ForestFire/flame と SnowFlake2 のモジュールを読み込めるようにする
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'ForestFire', 'flame'))
+sys.path.append(os.path.join(ROOT, 'SnowFlake2'))
+from cells import WOOD, LEAF, NORMAL, BURNING, CellGrid, MappedSteps, write_cells
+from scene import fill_slope, fill_band
+from forest import gen_forest
+from fire import FireSimulation
+from wind import WindFireSimulation
+from geometry import plot_equal_interval, sharp_vertices, outward_bisectors, grow_snowflake
+
+# 重い処理の所要時間を、問題の大きさを変えながら測るベンチマーク
+# 乱数の種は固定なので、同じマシンなら同じ入力で測る。結果は JSON に書き出し、基準の結果と比べて遅くなったものを報告する
+#
+# 時間はマシンによって大きく違うので、基準の結果はリポジトリに入れていない。比べるときは同じマシンで、
+# 変更前のコミットを checkout して基準を作り、変更後に同じ引数で --baseline を付けて実行する
+# （遅くなったものか、grow が元のループより遅いものがあれば終了コード 1）
+#
+#   git stash && python benchmarks/benchmark.py --quick --output baseline.json && git stash pop
+#   python benchmarks/benchmark.py --quick --baseline baseline.json
+
+GRID_SIZES = [(150, 100), (500, 500), (1000, 1000), (2000, 2000), (4000, 4000)]
+VERTEX_COUNTS = [1000, 10000, 100000]
+SEED = 0
+
+# base.py と同じ手順の森のシーン（斜面・落ち葉・木）。木の根元に近い列に火をつける
+def forest_scene(width, height, ignite=True):
+    grid = CellGrid(width, height)
+    fill_slope(grid, 10)
+    fill_band(grid, 10, 2)
+    gen_forest(grid, 10, radius=12, seed=SEED)
+    if ignite:
+        x = slice(width // 10, width // 10 + 5)
+        material = grid.material[x]
+        grid.state[x] = np.where((material == WOOD) | (material == LEAF), BURNING, NORMAL)
+    return grid
+
+# 頂点の間隔の 1/10 程度のぶれがある、6回対称の星形の多角形（頂点 count 個、時計回り）
+def star_polygon(count):
+    rng = np.random.default_rng(SEED)
+    theta = -np.linspace(0, 2 * np.pi, count, endpoint=False)
+    radius = 1 + 0.2 * np.cos(6 * theta) + 0.2 * np.pi / count * rng.standard_normal(count)
+    return np.stack([radius * np.cos(theta), radius * np.sin(theta)], axis=1)
+
+# 各ベンチマークは (準備, 測る処理, 呼び出し回数, 1回あたりの単位数, 単位の名前) を返す
+# 準備は時間に含めない。準備には測るたびに作る一時ディレクトリが渡され、測り終わると中身ごと消す
+
+def bench_scene_build(width, height):
+    return None, lambda _: forest_scene(width, height, ignite=False), 1, width * height, 'cell'
+
+def bench_fire_dense(width, height, steps=10):
+    def setup(directory):
+        return FireSimulation(forest_scene(width, height).cells)
+
+    def run(simulation):
+        for _ in range(steps):
+            simulation.step()
+    return setup, run, steps, width * height, 'cell'
+
+def bench_fire_frontier(width, height, steps=10):
+    def setup(directory):
+        return FireSimulation(forest_scene(width, height).cells, frontier=True)
+
+    def run(simulation):
+        for _ in range(steps):
+            simulation.step()
+    return setup, run, steps, width * height, 'cell'
+
+# 一様な風（slope=False）と、風と斜面。一様な風の重みはスカラーなので、fire_dense とほぼ同じ時間になるはず
+def bench_fire_wind(width, height, steps=10, slope=False):
+    def setup(directory):
+        return WindFireSimulation(forest_scene(width, height).cells, wind=(5.0, 0.0), slope=slope)
+
+    def run(simulation):
+        for _ in range(steps):
+            simulation.step()
+    return setup, run, steps, width * height, 'cell'
+
+# ステップファイルを書いておき、animate.py と同じくメモリマップして全ステップの素材を読む
+def bench_load_steps(width, height, steps=10):
+    def setup(directory):
+        filename_format = os.path.join(directory, 'cells_state_step_{}.bin')
+        cells = forest_scene(width, height).cells
+        for step in range(steps):
+            write_cells(filename_format.format(step + 1), cells)
+        return MappedSteps(filename_format, width, height, steps)
+
+    def run(frames):
+        for step in range(steps):
+            np.asarray(frames[step]['material']).sum()
+    return setup, run, steps, width * height, 'cell'
+
+# animate.play_cells の1フレーム分の更新と描画（Agg）
+# FuncAnimation の blit と同じく、背景を戻してから update が返した部分だけを描き直す
+def bench_render_frames(width, height, steps=5):
+    import matplotlib
+    matplotlib.use('Agg')
+    from animate import cells_view
+    import matplotlib.pyplot as plt
+
+    def setup(directory):
+        frames = np.stack([forest_scene(width, height).cells] * steps)
+        fig, update, init, _ = cells_view(frames, steps)
+        fig.canvas.draw()
+        background = fig.canvas.copy_from_bbox(fig.bbox)
+        return fig, update, background
+
+    def run(context):
+        fig, update, background = context
+        for step in range(steps):
+            fig.canvas.restore_region(background)
+            for artist in update(step):
+                artist.axes.draw_artist(artist)
+            fig.canvas.blit(fig.bbox)
+        plt.close(fig)
+    return setup, run, steps, width * height, 'cell'
+
+# system.cpp（大きさは 150x100・100ステップに固定されている）を最適化ビルドして実行する
+def bench_system_cpp(width, height, steps=100):
+    from cppbuild import build
+    import subprocess
+
+    def setup(directory):
+        binary = build(os.path.join(ROOT, 'ForestFire', 'flame', 'system.cpp'))[0]
+        write_cells(os.path.join(directory, 'cells_state.bin'), forest_scene(width, height).cells)
+        return binary, directory
+
+    def run(context):
+        binary, directory = context
+        subprocess.run([binary], cwd=directory, capture_output=True, check=True)
+    return setup, run, steps, width * height, 'cell'
+
+def bench_resample(count):
+    vertex = star_polygon(count)
+    interval = np.median(np.linalg.norm(np.diff(vertex, axis=0), axis=1)) / 2
+    return None, lambda _: plot_equal_interval(vertex, interval), 1, count, 'vertex'
+
+def bench_sharp_vertices(count):
+    vertex = star_polygon(count)
+    return None, lambda _: sharp_vertices(vertex, 175), 1, count, 'vertex'
+
+# 元のスクリプトと同じく、1頂点ずつ numpy の小さな配列で向きを求めて窓を動かす（grow を比べる基準）
+def grow_reference(vertex, grow_vertex_num_list, grow_length, wideness, interval):
+    wideness_range_abs = int(wideness / interval)
+    window = np.arange(-wideness_range_abs, wideness_range_abs + 1)
+    n = len(vertex)
+    for i in grow_vertex_num_list:
+        vec = outward_bisectors(vertex[[(i - 1) % n, i, (i + 1) % n]])[1]
+        np.add.at(vertex, (i + window) % n, vec * grow_length)
+    return vertex
+
+GROW_METHODS = {
+    'default': grow_snowflake,
+    'simultaneous': lambda *args: grow_snowflake(*args, simultaneous=True),
+    'reference': grow_reference,
+}
+
+# 尖った頂点（約 1/4）のまわり 15 頂点ほどの幅で伸ばす
+# method は grow_snowflake の既定（1頂点ずつと同じ結果）、simultaneous=True、基準のループのどれか
+def bench_grow(count, method='default'):
+    vertex = star_polygon(count)
+    selected = sharp_vertices(vertex, 170)
+    interval = 2 * np.pi / count
+    grow = GROW_METHODS[method]
+    return (lambda directory: vertex.copy()), lambda v: grow(v, selected, 0.01, 7 * interval, interval), 1, count, 'vertex'
+
+GRID_BENCHMARKS = {
+    'scene_build': bench_scene_build,
+    'fire_dense': bench_fire_dense,
+    'fire_frontier': bench_fire_frontier,
+    'fire_wind': bench_fire_wind,
+    'fire_wind_slope': lambda width, height: bench_fire_wind(width, height, slope=True),
+    'load_steps': bench_load_steps,
+    'render_frames': bench_render_frames,
+}
+POLYGON_BENCHMARKS = {
+    'resample': bench_resample,
+    'sharp_vertices': bench_sharp_vertices,
+    'grow': bench_grow,
+    'grow_simultaneous': lambda count: bench_grow(count, 'simultaneous'),
+    'grow_reference': lambda count: bench_grow(count, 'reference'),
+}
+
+# 準備をしてから run(準備の結果) を1回実行し、経過時間を返す。trace=True なら時間の代わりに最大のメモリ使用量を返す
+def _run_once(setup, run, trace=False):
+    with tempfile.TemporaryDirectory() as directory:
+        context = setup(directory) if setup else None
+        if trace:
+            tracemalloc.start()
+            run(context)
+            result = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            start = time.perf_counter()
+            run(context)
+            result = time.perf_counter() - start
+        del context  # メモリマップを閉じてからディレクトリを消す（Windows では開いたままのファイルを消せない）
+    return result
+
+# 1つのベンチマークを repeat 回測って最速の時間を求め、別にもう1回実行して最大のメモリ使用量を求める
+# （tracemalloc を動かしたままだと、特に Python のループが多い処理の時間が大きく伸びるので分ける）
+def measure(benchmark, args, repeat):
+    setup, run, calls, units, unit = benchmark(*args)
+    best = min(_run_once(setup, run) for _ in range(repeat))
+    peak = _run_once(setup, run, trace=True)
+    return {
+        "seconds": best,
+        "per_call": best / calls,
+        f"per_{unit}": best / calls / units,
+        "throughput": calls * units / best,  # 単位数 / 秒
+        "unit": unit,
+        "peak_memory": peak,
+    }
+
+def run_all(grid_sizes, vertex_counts, repeat, names=None, cpp=True):
+    results = []
+
+    def record(name, size, result):
+        result = dict(benchmark=name, size=size, **result)
+        results.append(result)
+        print(f"{name:16s} {str(size):14s} {result['per_call'] * 1e3:10.3f} ms/call "
+              f"{result['throughput']:12.4g} {result['unit']}/s {result['peak_memory'] / 2 ** 20:9.1f} MiB")
+
+    for name, benchmark in GRID_BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        for width, height in grid_sizes:
+            record(name, f"{width}x{height}", measure(benchmark, (width, height), repeat))
+    if cpp and (not names or 'system_cpp' in names):
+        try:
+            record('system_cpp', '150x100', measure(bench_system_cpp, (150, 100), repeat))
+        except RuntimeError as error:
+            print(f"system_cpp をスキップしました: {error}")
+    for name, benchmark in POLYGON_BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        for count in vertex_counts:
+            record(name, str(count), measure(benchmark, (count,), repeat))
+    return results
+
+# grow（既定の1頂点ずつの成長）が同じ大きさの grow_reference（元のスクリプトのループ）より遅かったものの一覧
+def slower_than_reference(results):
+    reference = {r["size"]: r for r in results if r["benchmark"] == 'grow_reference'}
+    return [(r["size"], reference[r["size"]]["per_call"], r["per_call"]) for r in results
+            if r["benchmark"] == 'grow' and r["size"] in reference and r["per_call"] > reference[r["size"]]["per_call"]]
+
+# 基準の結果より tolerance 以上遅くなったものの一覧
+def compare(results, baseline, tolerance):
+    reference = {(r["benchmark"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = reference.get((result["benchmark"], result["size"]))
+        if base and result["per_call"] > base["per_call"] * (1 + tolerance):
+            regressions.append((result["benchmark"], result["size"], base["per_call"], result["per_call"]))
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="ForestFire / SnowFlake2 のベンチマーク")
+    parser.add_argument('--output', help="結果を書き出す JSON ファイル")
+    parser.add_argument('--baseline', help="比べる基準の JSON ファイル（変更前に --output で作ったもの）")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="遅くなったとみなす割合（既定 0.2 = 20%%）")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--quick', action='store_true', help="小さい問題（150x100, 500x500, 1k / 10k 頂点）だけ")
+    parser.add_argument('--only', nargs='*', help="実行するベンチマークの名前")
+    parser.add_argument('--no-cpp', action='store_true', help="system.cpp のビルドと実行をしない")
+    args = parser.parse_args()
+
+    grid_sizes = GRID_SIZES[:2] if args.quick else GRID_SIZES
+    vertex_counts = VERTEX_COUNTS[:2] if args.quick else VERTEX_COUNTS
+    results = run_all(grid_sizes, vertex_counts, args.repeat, args.only, not args.no_cpp)
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "seed": SEED,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"File saved: {args.output}")
+
+    failed = False
+    for size, reference, grow in slower_than_reference(results):
+        print(f"grow が元のループより遅くなっています: {size}: {reference * 1e3:.3f} ms -> {grow * 1e3:.3f} ms")
+        failed = True
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for name, size, before, after in regressions:
+            print(f"遅くなりました: {name} {size}: {before * 1e3:.3f} ms -> {after * 1e3:.3f} ms")
+        failed = failed or bool(regressions)
+    if failed:
+        sys.exit(1)